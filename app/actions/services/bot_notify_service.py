@@ -5,11 +5,14 @@ from app.api.docs.enums.app_response_codes import AppResponseCode
 from app.api.docs.enums.http_status import HttpStatusCode
 from app.api.schemas.response import ResponseFromAnotherLogic
 from app.bot.create_bot import bot
+from app.bot.rate_limiter import outbound_priority, Priority
 
 logger = logging.getLogger(__name__)
 
 
 @wrap_telegram_error_handler
 async def notify_user_by_bot(user_id: int, text: str) -> ResponseFromAnotherLogic:
-    await bot.send_message(chat_id=user_id, text=text)
+    # Уведомления из API уступают глобальный лимит ответам пользователям
+    with outbound_priority(Priority.LOW):
+        await bot.send_message(chat_id=user_id, text=text)
     return ResponseFromAnotherLogic(message="Сообщение успешно отправлено", http_status=HttpStatusCode.OK, code=AppResponseCode.TG_200, data={'user_id': user_id})
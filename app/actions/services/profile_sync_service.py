@@ -0,0 +1,69 @@
+import asyncio
+import logging
+
+from aiogram.types import User
+from cachetools import LRUCache
+
+from app.bot.management.shared.dao.dao import UserDAO
+from app.config.settings import settings
+from app.dto.models.User.SUserCreate import SUserCreate
+from app.main_dao.base import run_in_session
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileWriteBehindBuffer:
+    """
+    Write-behind буфер профилей Telegram-пользователей.
+
+    `capture` вызывается на каждом апдейте и не обращается к БД: он сравнивает отпечаток профиля
+    (first_name, last_name, username, is_premium) с последним известным и откладывает только изменившиеся.
+    `flush` периодически (задача планировщика) сохраняет накопленное одним пакетным UPDATE:
+    профили только актуализируются, регистрация пользователей остаётся за /start.
+    """
+
+    def __init__(self, max_pending: int, fingerprint_cache_size: int):
+        self.max_pending = max_pending
+        self._fingerprints: LRUCache = LRUCache(maxsize=fingerprint_cache_size)
+        self._pending: dict[int, SUserCreate] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+
+    @staticmethod
+    def fingerprint(user: User) -> tuple:
+        return user.first_name, user.last_name, user.username, user.is_premium
+
+    def capture(self, user: User) -> None:
+        fingerprint = self.fingerprint(user)
+        if self._fingerprints.get(user.id) == fingerprint:
+            return
+        self._fingerprints[user.id] = fingerprint
+        self._pending[user.id] = SUserCreate(
+            telegram_id=user.id,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            username=user.username,
+            is_premium=user.is_premium
+        )
+        if len(self._pending) >= self.max_pending and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush())
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            try:
+                updated = await run_in_session(
+                    lambda session: UserDAO(session).update_profiles(list(batch.values()))
+                )
+                logger.debug(f"Профили пользователей синхронизированы: {len(batch)} (обновлено: {updated}).")
+            except Exception as e:
+                logger.error(f"Ошибка при синхронизации профилей пользователей ({len(batch)}): {e}")
+                # Возвращаем в очередь то, что не было перезаписано более свежими данными
+                for telegram_id, values in batch.items():
+                    self._pending.setdefault(telegram_id, values)
+
+
+profile_buffer = ProfileWriteBehindBuffer(max_pending=settings.PROFILE_SYNC_MAX_PENDING,
+                                          fingerprint_cache_size=settings.PROFILE_SYNC_FINGERPRINT_CACHE_SIZE)
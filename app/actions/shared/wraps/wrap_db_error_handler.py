@@ -8,6 +8,8 @@ from sqlalchemy.exc import SQLAlchemyError, DBAPIError, OperationalError
 from app.api.schemas.response import ResponseFromAnotherLogic
 from app.api.docs.enums.http_status import HttpStatusCode
 from app.api.docs.enums.app_response_codes import AppResponseCode
+from app.main_dao.db_budget import is_db_timeout_error
+from app.main_dao.db_resilience import DatabaseUnavailableError
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +25,12 @@ def wrap_db_error_handler(func: Callable[P, Awaitable[ResponseFromAnotherLogic]]
         try:
             return await func(*args, **kwargs)
 
+        except DatabaseUnavailableError as e:
+            logger.warning(f"[{user_id}] БД недоступна, запрос отклонён: {e}")
+            return ResponseFromAnotherLogic(message="[Database] База данных временно недоступна. Повторите позже.",
+                                            http_status=HttpStatusCode.SERVICE_UNAVAILABLE,
+                                            code=AppResponseCode.DB_503)
+
         except OperationalError as e:
             status = HttpStatusCode.SERVICE_UNAVAILABLE
             logger.warning(f"[{user_id}] Ошибка подключения к БД: {e}\n{traceback.format_exc()}")
@@ -31,6 +39,11 @@ def wrap_db_error_handler(func: Callable[P, Awaitable[ResponseFromAnotherLogic]]
                                             code=AppResponseCode.DB_503)
 
         except DBAPIError as e:
+            if is_db_timeout_error(e):
+                logger.warning(f"[{user_id}] Превышен бюджет времени запроса к БД: {e}")
+                return ResponseFromAnotherLogic(message="[Database] Превышено время выполнения запроса. Повторите позже.",
+                                                http_status=HttpStatusCode.GATEWAY_TIMEOUT,
+                                                code=AppResponseCode.DB_504)
             status = HttpStatusCode.INTERNAL_SERVER_ERROR
             logger.error(f"[{user_id}] Ошибка DBAPI: {e}\n{traceback.format_exc()}")
             return ResponseFromAnotherLogic(message="[Database] Внутренняя ошибка базы данных.",
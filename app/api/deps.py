@@ -1,4 +1,4 @@
-from typing import Any, AsyncGenerator
+from typing import Any, AsyncGenerator, Callable
 
 from aiogram import Bot
 
@@ -20,6 +20,36 @@ async def get_session_with_commit() -> AsyncGenerator[Any, Any]:
             raise
 
 
+def get_session_with_budget(statement_timeout: float, lock_timeout: float | None = None,
+                            commit: bool = False) -> Callable[[], AsyncGenerator[Any, Any]]:
+    """
+    Зависимость с бюджетом времени запросов (сек), например
+    `session: AsyncSession = Depends(get_session_with_budget(statement_timeout=2))`.
+    Превышение бюджета обрабатывается `db_api_error_handler` как 504.
+    """
+    async def dependency() -> AsyncGenerator[Any, Any]:
+        async with async_session_scope(read_only=not commit, statement_timeout=statement_timeout,
+                                       lock_timeout=lock_timeout) as session:
+            if not commit:
+                yield session
+                return
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    return dependency
+
+
 async def get_session_without_commit() -> AsyncGenerator[Any, Any]:
-    async with async_session_scope() as session:
+    """Сессия только для чтения: BEGIN READ ONLY, без коммита, допускается реплика."""
+    async with async_session_scope(read_only=True) as session:
+        yield session
+
+
+async def get_primary_session_without_commit() -> AsyncGenerator[Any, Any]:
+    """Сессия только для чтения на primary (без реплики) — для проверок доступности основной БД."""
+    async with async_session_scope(read_only=True, allow_replica=False) as session:
         yield session
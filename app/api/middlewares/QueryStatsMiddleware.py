@@ -0,0 +1,17 @@
+from starlette.types import ASGIApp, Scope, Receive, Send
+
+from app.main_dao.query_stats import track_queries
+
+
+class QueryStatsMiddleware:
+    """Собирает статистику SQL-запросов (количество, время БД, N+1, медленные запросы) по каждому API-запросу."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        with track_queries(f"{scope.get('method', '-')} {scope.get('path', '-')}"):
+            await self.app(scope, receive, send)
@@ -8,6 +8,8 @@ import traceback
 from sqlalchemy.exc import SQLAlchemyError, DBAPIError, OperationalError
 
 from app.api.docs.enums.http_status import HttpStatusCode
+from app.main_dao.db_budget import is_db_timeout_error
+from app.main_dao.db_resilience import DatabaseUnavailableError
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +25,12 @@ async def db_api_error_handler(user_id: int = -1) -> AsyncGenerator[DBErrorConte
     try:
         yield ctx
 
+    except DatabaseUnavailableError as e:
+        status = HttpStatusCode.SERVICE_UNAVAILABLE
+        msg = "База данных временно недоступна. Повторите попытку позже."
+        logger.warning(f"[{user_id}] [DB:Unavailable] {e}")
+        ctx.result = {"http_status": status, "message": msg}
+
     except OperationalError as e:
         status = HttpStatusCode.SERVICE_UNAVAILABLE
         msg = "Ошибка соединения с базой данных. Повторите попытку позже."
@@ -30,9 +38,14 @@ async def db_api_error_handler(user_id: int = -1) -> AsyncGenerator[DBErrorConte
         ctx.result = {"http_status": status, "message": msg}
 
     except DBAPIError as e:
-        status = HttpStatusCode.INTERNAL_SERVER_ERROR
-        msg = "Ошибка на уровне драйвера базы данных."
-        logger.error(f"[{user_id}] [DB:DBAPIError] {e}\n{traceback.format_exc()}")
+        if is_db_timeout_error(e):
+            status = HttpStatusCode.GATEWAY_TIMEOUT
+            msg = "Превышено время выполнения запроса к базе данных. Повторите попытку позже."
+            logger.warning(f"[{user_id}] [DB:Timeout] {e}")
+        else:
+            status = HttpStatusCode.INTERNAL_SERVER_ERROR
+            msg = "Ошибка на уровне драйвера базы данных."
+            logger.error(f"[{user_id}] [DB:DBAPIError] {e}\n{traceback.format_exc()}")
         ctx.result = {"http_status": status, "message": msg}
 
     except SQLAlchemyError as e:
@@ -8,6 +8,7 @@ from starlette.middleware import Middleware
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from app.api.middlewares.LoggingMiddleware import LoggingMiddleware
+from app.api.middlewares.QueryStatsMiddleware import QueryStatsMiddleware
 from app.api.v1.routes import api_router
 from app.config.settings import settings
 
@@ -25,7 +26,8 @@ async def lifespan(app: FastAPI):
 
 
 api_middlewares: List[Middleware] = [
-    Middleware(LoggingMiddleware)
+    Middleware(LoggingMiddleware),
+    Middleware(QueryStatsMiddleware)
 ]
 
 tags_metadata = [
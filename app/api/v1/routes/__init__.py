@@ -1,8 +1,13 @@
 from fastapi import APIRouter
 from app.api.v1.routes.ping import router as ping_router
 from app.api.v1.routes.notify import router as notify_router
+from app.api.v1.routes.telegram_webhook import router as telegram_webhook_router
+from app.config.settings import settings
 
 api_router = APIRouter()
 
 api_router.include_router(ping_router, tags=["system"])
-api_router.include_router(notify_router, tags=["messages"])
\ No newline at end of file
+api_router.include_router(notify_router, tags=["messages"])
+
+if settings.BOT_UPDATES_MODE == "webhook":
+    api_router.include_router(telegram_webhook_router, tags=["telegram"])
@@ -3,11 +3,12 @@ import logging
 from aiogram import Bot
 from fastapi import APIRouter, Request, Depends
 from pydantic import BaseModel, Field
-from sqlalchemy import select, func
+from redis.exceptions import RedisError
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.responses import JSONResponse
 
-from app.api.deps import get_session_without_commit, get_bot
+from app.api.deps import get_primary_session_without_commit, get_bot
 from app.api.docs.consts.default_telegram_errors import TELEGRAM_API_ERROR_RESPONSES
 from app.api.docs.enums.app_response_codes import AppResponseCode
 from app.api.docs.enums.http_human_status import HttpHumanStatusCode
@@ -18,7 +19,14 @@ from app.api.schemas.response import (ResponseModelSuccessExample, ErrorResponse
                                       ResponseConfig)
 from app.api.utils.db_api_error_handler import db_api_error_handler
 from app.api.utils.telegram_handler import telegram_api_error_handler
+from app.bot.backpressure import backpressure
+from app.bot.dispatch_scheduler import dispatch_scheduler
+from app.bot.update_queue import update_queue
+from app.main_dao.database import engine, pool_metrics, replica_engine, replica_pool_metrics
 from app.main_dao.models import TgUser
+from app.main_dao.db_resilience import db_circuit_breaker, db_retry_budget
+from app.main_dao.row_counter import row_counter
+from app.config.settings import settings
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -28,13 +36,30 @@ class PingResponseData(BaseModel):
     pong: bool = Field(...,
                        description="Флаг, подтверждающий доступность сервиса")
     database_user_count: int = Field(...,
-                                     description="Общее количество пользователей в таблице телеграмм-пользователей")
+                                     description="Количество пользователей в таблице телеграмм-пользователей "
+                                                 "(по умолчанию — периодически пересчитываемое значение)")
     bot_first_name: str = Field(...,
                                 description="Название Telegram-бота.")
+    database_pool: dict = Field(...,
+                                description="Состояние пулов соединений БД (primary и, если настроена, replica): "
+                                            "занятые соединения, overflow, ожидание соединения")
+    database_resilience: dict = Field(...,
+                                      description="Состояние circuit breaker БД и глобального бюджета повторов")
+    dispatch: dict | None = Field(None,
+                                  description="Обработка апдейтов в этом процессе (если включён лимит): глубина очереди, "
+                                              "апдейты в обработке, время обработки, паузы получения апдейтов")
+    update_queue: dict | None = Field(None,
+                                      description="Очередь апдейтов Redis Streams (если включена): опубликовано, "
+                                                  "pending, lag и длина потоков по партициям")
 
     @staticmethod
     def example() -> dict:
-        return PingResponseData(pong=True, database_user_count=12345, bot_first_name="Мой Telegram Bot").model_dump()
+        return PingResponseData(pong=True, database_user_count=12345, bot_first_name="Мой Telegram Bot",
+                                database_pool={"primary": {"pool_size": 5, "checked_out": 1, "overflow": -4,
+                                                           "waiting": 0, "wait_time_avg": 0.0004,
+                                                           "wait_time_max": 0.0021}},
+                                database_resilience={"circuit_breaker": {"state": "closed", "rejected": 0},
+                                                     "retry_budget": {"tokens": 20.0, "retries": 0}}).model_dump()
 
 
 PING_RESPONSES_DOCS = ResponseConfig(
@@ -68,11 +93,12 @@ PING_ENDPOINT_DESCRIPTION = ("Эндпоинт предназначен для 
              operation_id="pingSystemHealthCheck",
              response_model_exclude_none=False)
 async def ping(request: Request,
-               session: AsyncSession = Depends(get_session_without_commit)) -> JSONResponse:
+               session: AsyncSession = Depends(get_primary_session_without_commit)) -> JSONResponse:
     user_count = 0
     async with db_api_error_handler() as db_ctx:
-        result = await session.execute(select(func.count()).select_from(TgUser))
-        user_count = result.scalar_one()
+        # Проверка доступности primary БД не зависит от режима подсчёта (maintained не обращается к БД)
+        await session.execute(text("SELECT 1"))
+        user_count = await row_counter.count(session, TgUser, mode=settings.PING_USER_COUNT_MODE)
 
     if db_ctx.result:
         return JSONResponse(
@@ -96,7 +122,28 @@ async def ping(request: Request,
                                 code=f"DB_{tg_ctx.result["http_status"]}"
                             ).model_dump())
 
-    return_data = PingResponseData(pong=True, database_user_count=user_count, bot_first_name=bot_me.first_name)
+    dispatch_stats = None
+    if settings.DISPATCH_CONCURRENCY_LIMIT > 0:
+        dispatch_stats = {"scheduler": dispatch_scheduler.stats(), "backpressure": backpressure.stats()}
+
+    queue_stats = None
+    if settings.UPDATE_QUEUE_ENABLED:
+        try:
+            queue_stats = await update_queue.stats()
+        except RedisError as e:
+            logger.warning(f"Не удалось получить метрики очереди апдейтов: {e}")
+            queue_stats = {"error": str(e)}
+
+    database_pool = {"primary": pool_metrics.snapshot(engine)}
+    if replica_engine is not None:
+        database_pool["replica"] = replica_pool_metrics.snapshot(replica_engine)
+
+    return_data = PingResponseData(pong=True, database_user_count=user_count, bot_first_name=bot_me.first_name,
+                                   database_pool=database_pool,
+                                   database_resilience={"circuit_breaker": db_circuit_breaker.stats(),
+                                                        "retry_budget": db_retry_budget.stats()},
+                                   dispatch=dispatch_stats,
+                                   update_queue=queue_stats)
 
     return JSONResponse(status_code=HttpStatusCode.OK,
                         content=ResponseEnvelope.success(
@@ -0,0 +1,72 @@
+import hmac
+import logging
+
+from aiogram.types import Update
+from fastapi import APIRouter, Request, Header
+from pydantic import ValidationError
+from redis.exceptions import RedisError
+from starlette.responses import JSONResponse, Response
+
+from app.api.docs.enums.app_response_codes import AppResponseCode
+from app.api.docs.enums.http_status import HttpStatusCode
+from app.api.schemas.response import ResponseEnvelope
+from app.bot.backpressure import backpressure, Backpressure
+from app.bot.create_bot import bot
+from app.bot.update_queue import update_queue
+from app.bot.webhook import WEBHOOK_PATH, feed_update_in_background
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.post(WEBHOOK_PATH, include_in_schema=False)
+async def telegram_webhook(request: Request,
+                           x_telegram_bot_api_secret_token: str | None = Header(default=None)) -> Response:
+    """Приём апдейтов Telegram: проверка секретного заголовка и передача апдейта диспетчеру в фоне."""
+    if not hmac.compare_digest((x_telegram_bot_api_secret_token or "").encode(), settings.WEBHOOK_SECRET.encode()):
+        logger.warning(f"Запрос к вебхуку с неверным секретным токеном от {request.client.host if request.client else '-'}")
+        return JSONResponse(status_code=HttpStatusCode.FORBIDDEN,
+                            content=ResponseEnvelope.error(request=request,
+                                                           message="Неверный секретный токен вебхука.",
+                                                           http_status=HttpStatusCode.FORBIDDEN,
+                                                           code=AppResponseCode.SYS_403).model_dump())
+    body = await request.body()
+    try:
+        update = Update.model_validate_json(body, context={"bot": bot})
+    except (ValidationError, ValueError) as e:
+        logger.warning(f"Некорректный апдейт в вебхуке: {e}")
+        return JSONResponse(status_code=HttpStatusCode.BAD_REQUEST,
+                            content=ResponseEnvelope.error(request=request,
+                                                           message="Некорректный апдейт.",
+                                                           http_status=HttpStatusCode.BAD_REQUEST,
+                                                           code=AppResponseCode.SYS_400).model_dump())
+
+    if not settings.UPDATE_QUEUE_ENABLED:
+        overload = backpressure.reject() if settings.DISPATCH_CONCURRENCY_LIMIT > 0 else None
+        if overload is not None:
+            # Telegram повторит доставку апдейта позже
+            http_status, code = ((HttpStatusCode.TOO_MANY_REQUESTS, AppResponseCode.SYS_429)
+                                 if overload == Backpressure.IN_FLIGHT
+                                 else (HttpStatusCode.SERVICE_UNAVAILABLE, AppResponseCode.SYS_503))
+            logger.warning(f"Апдейт {update.update_id} отклонён: перегрузка ({overload})")
+            return JSONResponse(status_code=http_status,
+                                headers={"Retry-After": "1"},
+                                content=ResponseEnvelope.error(request=request,
+                                                               message=f"Обработка апдейтов перегружена ({overload}).",
+                                                               http_status=http_status,
+                                                               code=code).model_dump())
+        feed_update_in_background(update)
+        return Response(status_code=HttpStatusCode.OK)
+
+    try:
+        await update_queue.publish(update, raw=body)
+    except RedisError as e:
+        # Telegram повторит доставку апдейта
+        logger.error(f"Не удалось опубликовать апдейт {update.update_id} в очередь: {e}")
+        return JSONResponse(status_code=HttpStatusCode.SERVICE_UNAVAILABLE,
+                            content=ResponseEnvelope.error(request=request,
+                                                           message="Очередь апдейтов недоступна.",
+                                                           http_status=HttpStatusCode.SERVICE_UNAVAILABLE,
+                                                           code=AppResponseCode.SYS_503).model_dump())
+    return Response(status_code=HttpStatusCode.OK)
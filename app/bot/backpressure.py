@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import time
+
+from app.bot.dispatch_scheduler import DispatchScheduler, dispatch_scheduler
+from app.config.settings import settings
+from app.main_dao.database import pool_metrics
+from app.main_dao.pool_metrics import PoolMetrics
+
+logger = logging.getLogger(__name__)
+
+# Период проверки снижения нагрузки во время паузы, сек
+CHECK_INTERVAL = 0.05
+
+
+class Backpressure:
+    """
+    Обратное давление между получением апдейтов и обработкой.
+
+    Перегрузка — апдейтов в очереди и обработке `DispatchScheduler` не меньше `high_watermark`, либо больше
+    `low_watermark` при признаках деградации: в очереди пула primary БД не меньше `max_pool_waiters` ожидающих
+    или среднее время обработки апдейта не меньше `max_handler_latency`. Во время перегрузки получение
+    апдейтов приостанавливается (`wait_capacity`) до снижения числа апдейтов в обработке до `low_watermark`,
+    а вебхук отклоняет апдейты (Telegram доставит их повторно).
+    """
+    IN_FLIGHT, DB_POOL_WAIT, HANDLER_LATENCY = 'in_flight', 'db_pool_wait', 'handler_latency'
+
+    def __init__(self, scheduler: DispatchScheduler, metrics: PoolMetrics, high_watermark: int, low_watermark: int,
+                 max_pool_waiters: int, max_handler_latency: float):
+        self.scheduler = scheduler
+        self.metrics = metrics
+        self.high_watermark = high_watermark
+        self.low_watermark = min(low_watermark, high_watermark)
+        self.max_pool_waiters = max_pool_waiters
+        self.max_handler_latency = max_handler_latency
+        self._paused_since: float | None = None
+        self.pauses = 0
+        self.pause_time_total = 0.0
+        self.rejected = 0
+
+    def overload_reason(self) -> str | None:
+        in_flight = self.scheduler.in_flight
+        if in_flight >= self.high_watermark:
+            return self.IN_FLIGHT
+        if in_flight > self.low_watermark:
+            if self.metrics.waiting >= self.max_pool_waiters:
+                return self.DB_POOL_WAIT
+            if self.scheduler.latency_ewma >= self.max_handler_latency:
+                return self.HANDLER_LATENCY
+        return None
+
+    async def wait_capacity(self) -> None:
+        """Приостанавливает получение апдейтов, пока система перегружена."""
+        reason = self.overload_reason()
+        if reason is None:
+            return
+        if self._paused_since is None:
+            self._paused_since = time.monotonic()
+            self.pauses += 1
+            logger.warning(f"Получение апдейтов приостановлено ({reason}): {self.snapshot()}")
+        while self.scheduler.in_flight > self.low_watermark:
+            await asyncio.sleep(CHECK_INTERVAL)
+        if self._paused_since is not None:
+            paused_for = time.monotonic() - self._paused_since
+            self._paused_since = None
+            self.pause_time_total += paused_for
+            logger.info(f"Получение апдейтов возобновлено после паузы {paused_for:.2f} сек.")
+
+    def reject(self) -> str | None:
+        """Причина отклонения апдейта вебхука или None, если апдейт можно принять."""
+        reason = self.overload_reason()
+        if reason is not None:
+            self.rejected += 1
+        return reason
+
+    def snapshot(self) -> dict:
+        return {
+            "in_flight": self.scheduler.in_flight,
+            "db_pool_waiting": self.metrics.waiting,
+            "handler_latency_ewma": round(self.scheduler.latency_ewma, 6),
+        }
+
+    def stats(self) -> dict:
+        paused_for = time.monotonic() - self._paused_since if self._paused_since is not None else 0.0
+        return {
+            **self.snapshot(),
+            "overload": self.overload_reason(),
+            "paused": self._paused_since is not None,
+            "pauses": self.pauses,
+            "pause_time_total": round(self.pause_time_total + paused_for, 3),
+            "rejected": self.rejected,
+        }
+
+
+backpressure = Backpressure(scheduler=dispatch_scheduler, metrics=pool_metrics,
+                            high_watermark=settings.DISPATCH_HIGH_WATERMARK,
+                            low_watermark=settings.DISPATCH_LOW_WATERMARK,
+                            max_pool_waiters=settings.DISPATCH_MAX_POOL_WAITERS,
+                            max_handler_latency=settings.DISPATCH_MAX_HANDLER_LATENCY)
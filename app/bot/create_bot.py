@@ -4,10 +4,12 @@ from app.bot.management.admin.router import router as admin_router, register_adm
 from app.bot.management.user.router import router as user_router, register_user_handlers
 from app.bot.management.shared.router import router as shared_router, register_shared_handlers
 
+from app.bot.management.shared.middlewares.dispatch_scheduler import DispatchSchedulerMiddleware
 from app.bot.management.shared.middlewares.errors import ErrorHandlingMiddleware
 from app.bot.management.shared.middlewares.only_private_chat import PrivateChatMiddleware
 from app.bot.management.shared.middlewares.throttling import ThrottlingMiddleware
 from app.bot.management.shared.middlewares.log import LogActionMiddleware
+from app.bot.management.shared.middlewares.profile_sync import ProfileSyncMiddleware
 from app.config.settings import settings
 
 import logging
@@ -17,7 +19,10 @@ from aiogram.enums import ParseMode
 from aiogram.fsm.storage.redis import RedisStorage
 from aiogram.types import BotCommand, BotCommandScopeDefault
 
-from app.main_dao.database_middleware import DatabaseMiddlewareWithoutCommit, DatabaseMiddlewareWithCommit
+from app.bot.backpressure import backpressure
+from app.bot.dispatch_scheduler import dispatch_scheduler
+from app.bot.rate_limiter import RateLimitRequestMiddleware, outbound_rate_limiter
+from app.main_dao.database_middleware import DatabaseMiddleware
 
 
 async def set_commands():
@@ -40,6 +45,10 @@ async def stop_bot():
 logger = logging.getLogger(__name__)
 
 bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+if settings.TELEGRAM_RATE_LIMIT_ENABLED:
+    bot.session.middleware(RateLimitRequestMiddleware(outbound_rate_limiter,
+                                                      max_retries=settings.TELEGRAM_RETRY_AFTER_MAX_RETRIES,
+                                                      max_retry_after=settings.TELEGRAM_RETRY_AFTER_MAX_WAIT))
 # botStorage = MemoryStorage()
 key_builder = DefaultKeyBuilder(with_destiny=True)
 botStorage = RedisStorage.from_url(settings.REDIS_URL, key_builder=key_builder)
@@ -48,6 +57,12 @@ dp = Dispatcher(storage=botStorage)
 dp.startup.register(start_bot)
 dp.shutdown.register(stop_bot)
 
+if settings.DISPATCH_CONCURRENCY_LIMIT > 0:
+    dp.update.outer_middleware(DispatchSchedulerMiddleware(dispatch_scheduler, backpressure))
+
+dp.message.outer_middleware(ProfileSyncMiddleware())
+dp.callback_query.outer_middleware(ProfileSyncMiddleware())
+
 dp.message.middleware(PrivateChatMiddleware())
 dp.callback_query.middleware(PrivateChatMiddleware())
 
@@ -57,8 +72,8 @@ dp.callback_query.middleware(ThrottlingMiddleware(0.4))
 dp.message.middleware(ErrorHandlingMiddleware())
 dp.callback_query.middleware(ErrorHandlingMiddleware())
 
-dp.update.middleware.register(DatabaseMiddlewareWithoutCommit())
-dp.update.middleware.register(DatabaseMiddlewareWithCommit())
+dp.message.middleware(DatabaseMiddleware())
+dp.callback_query.middleware(DatabaseMiddleware())
 
 register_admin_handlers()
 admin_router.message.middleware(LogActionMiddleware())
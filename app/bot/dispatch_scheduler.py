@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Hashable
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DispatchScheduler:
+    """
+    Планировщик обработки апдейтов: глобальный лимит одновременно выполняемых апдейтов
+    и последовательная очередь на каждый ключ (чат).
+
+    Апдейты разных чатов выполняются параллельно (не более `concurrency_limit` одновременно),
+    апдейты одного чата — строго по очереди, в порядке поступления: два быстрых нажатия одного
+    пользователя не читают и не перезаписывают данные FSM одновременно.
+    """
+    # Коэффициент сглаживания для скользящего среднего времени обработки апдейта
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, concurrency_limit: int):
+        self.concurrency_limit = concurrency_limit
+        self._semaphore = asyncio.Semaphore(concurrency_limit)
+        self._queues: dict[Hashable, deque] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.active = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.processed = 0
+        self.latency_ewma = 0.0
+
+    @property
+    def in_flight(self) -> int:
+        """Апдейты в очереди и в обработке."""
+        return self.queued + self.active
+
+    def submit(self, key: Hashable | None, work: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """
+        Ставит работу в очередь ключа.
+
+        Args:
+            key (Hashable | None): Ключ очереди (id чата); None — без упорядочивания, только глобальный лимит
+            work (Callable[[], Awaitable[Any]]): Обработка апдейта
+
+        Returns:
+            asyncio.Future: Результат обработки
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        if key is None:
+            self._spawn(self._run(work, future))
+            return future
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+            self._spawn(self._drain(key, queue))
+        queue.append((work, future))
+        return future
+
+    def _spawn(self, coroutine: Awaitable) -> None:
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self, key: Hashable, queue: deque) -> None:
+        try:
+            while queue:
+                work, future = queue.popleft()
+                await self._run(work, future)
+        finally:
+            # Очередь удаляется без await после проверки: новая работа ключа создаст новую очередь
+            del self._queues[key]
+            for _, future in queue:
+                self.queued -= 1
+                future.cancel()
+
+    async def _run(self, work: Callable[[], Awaitable[Any]], future: asyncio.Future) -> None:
+        started = False
+        try:
+            async with self._semaphore:
+                started = True
+                self.queued -= 1
+                self.active += 1
+                started_at = time.perf_counter()
+                try:
+                    result = await work()
+                finally:
+                    self.active -= 1
+                    self.processed += 1
+                    self.latency_ewma += self.EWMA_ALPHA * (time.perf_counter() - started_at - self.latency_ewma)
+        except asyncio.CancelledError:
+            if not started:
+                self.queued -= 1
+            future.cancel()
+            raise
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    async def wait_idle(self, timeout: float | None = None) -> None:
+        """Дожидается обработки всех поставленных апдейтов (при остановке)."""
+        if self._tasks:
+            logger.info(f"Ожидание обработки {self.queued + self.active} апдейтов.")
+            await asyncio.wait(set(self._tasks), timeout=timeout)
+
+    def stats(self) -> dict:
+        return {
+            "concurrency_limit": self.concurrency_limit,
+            "active": self.active,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "chats": len(self._queues),
+            "processed": self.processed,
+            "latency_ewma": round(self.latency_ewma, 6),
+        }
+
+
+dispatch_scheduler = DispatchScheduler(concurrency_limit=max(settings.DISPATCH_CONCURRENCY_LIMIT, 1))
@@ -1,8 +1,17 @@
-from typing import Literal
+from typing import Literal, Sequence, List, Iterable
 
-from sqlalchemy import func
+from pydantic import BaseModel
+from sqlalchemy import func, literal, literal_column, bindparam, any_
+from sqlalchemy.dialects.postgresql import insert as pg_insert, ARRAY
 from sqlalchemy.exc import SQLAlchemyError
-from app.main_dao.base import BaseDAO
+from sqlalchemy.orm.interfaces import ORMOption
+from app.config.settings import settings
+from app.dto.models.Admin.SAdmin import SAdmin
+from app.dto.models.User.SUser import SUser
+from app.main_dao.base import BaseDAO, BULK_INSERT_CHUNK_SIZE, BULK_UPDATE_CHUNK_SIZE, run_in_session
+from app.main_dao.batch_loader import BatchLoader
+from app.main_dao.identity_cache import IdentityCache
+from app.main_dao.query_cache import query_cache
 from app.main_dao.models import TgUser, AdminAccount
 from sqlalchemy.future import select
 import logging
@@ -12,18 +21,109 @@ logger= logging.getLogger(__name__)
 
 
 class TelegramIDMixin:
-    async def find_by_telegram_id(self, telegram_id: int) -> object | None:
+    """
+    Поиск по telegram_id для UserDAO/AdminDAO.
+
+    Промахи `find_snapshot_by_telegram_id`, запрошенные конкурентными хендлерами в одной итерации event loop,
+    объединяются `BatchLoader` в один запрос `WHERE telegram_id = ANY($1)` (в отдельной read-only сессии primary).
+    """
+    async def find_by_telegram_id(self, telegram_id: int, options: Sequence[ORMOption] | None = None) -> object | None:
         """
-        Ищет запись в базе по telegram_id.
+        Ищет запись в базе по telegram_id (отдельный запрос в сессии DAO, без объединения в пакет).
+        Для чтений на каждый апдейт без изменения записи — `find_snapshot_by_telegram_id`.
 
         Параметры:
             telegram_id (int): Telegram ID записи.
+            options (Sequence[ORMOption] | None): Загрузчики связей (noload/joinedload/selectinload);
+                по умолчанию связи не загружаются.
 
         Возвращает:
             Объект модели или None, если запись не найдена.
         """
+        generation = self.identity_cache.generation(telegram_id) if self.identity_cache is not None else None
+        record = await self._query_by_telegram_id(telegram_id, options)
+        # Незакоммиченные изменения сессии в кеш не попадают (после отката они не существуют),
+        # данные реплики — тоже (реплика может отставать от последних записей)
+        if (self.identity_cache is not None and not self._has_uncommitted_writes()
+                and not self._is_replica_session()):
+            self._remember_snapshot(telegram_id, record, generation)
+        return record
+
+    async def find_snapshot_by_telegram_id(self, telegram_id: int) -> BaseModel | None:
+        """
+        Возвращает снимок записи (Pydantic-схема `snapshot_schema`, не привязанная к сессии) по telegram_id.
+        Повторные обращения обслуживаются из `identity_cache` без запроса к БД.
+
+        Параметры:
+            telegram_id (int): Telegram ID записи.
+
+        Возвращает:
+            Снимок записи или None, если запись не найдена.
+        """
+        if self._has_uncommitted_writes():
+            # Сессия уже меняла таблицу: снимок читается в ней же и не кешируется до коммита
+            record = await self._query_by_telegram_id(telegram_id)
+            return self.snapshot_schema.model_validate(record) if record is not None else None
+        if self.identity_cache is not None:
+            snapshot = self.identity_cache.get(telegram_id)
+            if snapshot is not IdentityCache.MISSING:
+                return snapshot
+        return await self.snapshot_loader().load(telegram_id)
+
+    async def find_by_telegram_ids(self, telegram_ids: Iterable[int],
+                                   options: Sequence[ORMOption] | None = None) -> dict[int, object]:
+        """
+        Ищет записи по списку telegram_id одним запросом `WHERE telegram_id = ANY($1)`.
+
+        Параметры:
+            telegram_ids (Iterable[int]): Telegram ID записей.
+            options (Sequence[ORMOption] | None): Загрузчики связей; по умолчанию связи не загружаются.
+
+        Возвращает:
+            dict[int, object]: Найденные записи по telegram_id (отсутствующих ключей в словаре нет).
+        """
+        telegram_ids = list(dict.fromkeys(telegram_ids))
+        if not telegram_ids:
+            return {}
+        try:
+            telegram_id_column = self.model.telegram_id
+            query = self._select_query(options=options).where(
+                telegram_id_column == any_(bindparam('telegram_ids', telegram_ids, type_=ARRAY(telegram_id_column.type)))
+            )
+            result = await self._session.execute(query)
+            records = {record.telegram_id: record for record in result.scalars()}
+            logger.debug(f"Найдено {len(records)} из {len(telegram_ids)} записей по списку telegram_id.")
+            return records
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при поиске записей по списку telegram_id ({len(telegram_ids)}): {e}")
+            raise
+
+    @classmethod
+    def snapshot_loader(cls) -> BatchLoader:
+        """Общий для класса DAO загрузчик снимков по telegram_id."""
+        loader = cls.__dict__.get('_snapshot_loader')
+        if loader is None:
+            loader = BatchLoader(cls._load_snapshots)
+            cls._snapshot_loader = loader
+        return loader
+
+    @classmethod
+    async def _load_snapshots(cls, telegram_ids: list[int]) -> dict[int, BaseModel | None]:
+        async def load(session) -> dict[int, BaseModel | None]:
+            dao = cls(session)
+            generations = {telegram_id: cls.identity_cache.generation(telegram_id) if cls.identity_cache else None
+                           for telegram_id in telegram_ids}
+            records = await dao.find_by_telegram_ids(telegram_ids)
+            return {telegram_id: dao._remember_snapshot(telegram_id, records.get(telegram_id),
+                                                        generations[telegram_id])
+                    for telegram_id in telegram_ids}
+
+        # Снимки кешируются на IDENTITY_CACHE_TTL, поэтому читаются с primary: реплика может отставать от записи
+        return await run_in_session(load, read_only=True, allow_replica=False)
+
+    async def _query_by_telegram_id(self, telegram_id: int, options: Sequence[ORMOption] | None = None) -> object | None:
         try:
-            query = select(self.model).filter_by(telegram_id=telegram_id)
+            query = self._select_query(options=options).filter_by(telegram_id=telegram_id)
             result = await self._session.execute(query)
             record = result.scalar_one_or_none()
             logger.debug(f"Пользователь с telegram_id={telegram_id} {'найден' if record else 'не найден'}.")
@@ -32,10 +132,131 @@ class TelegramIDMixin:
             logger.error(f"Ошибка при поиске пользователя telegram_id={telegram_id}: {e}")
             raise
 
+    def _remember_snapshot(self, telegram_id: int, record,
+                           generation: tuple[int, int] | None = None) -> BaseModel | None:
+        """Кеширует снимок записи; `generation` — поколение ключа, взятое до запроса (см. IdentityCache)."""
+        snapshot = self.snapshot_schema.model_validate(record) if record is not None else None
+        if self.identity_cache is not None:
+            self.identity_cache.set(telegram_id, snapshot, generation)
+        return snapshot
+
 
 class UserDAO(BaseDAO[TgUser], TelegramIDMixin):
     model = TgUser
+    snapshot_schema = SUser
+    identity_cache = IdentityCache(key_field='telegram_id',
+                                   maxsize=settings.IDENTITY_CACHE_MAXSIZE,
+                                   ttl=settings.IDENTITY_CACHE_TTL)
+
+    async def upsert_with_admin_account(self, values: BaseModel) -> bool:
+        """
+        Регистрирует или актуализирует пользователя за один запрос к БД.
+
+        Upsert пользователя по telegram_id выполняется в CTE; если строка была вставлена (xmax = 0),
+        в том же запросе создаётся запись администратора с параметрами по умолчанию.
+        Существующий пользователь обновляется только при изменении данных профиля.
+
+        Параметры:
+            values (BaseModel): Данные пользователя (включая telegram_id).
+
+        Возвращает:
+            bool: True, если пользователь был создан.
+        """
+        return await self.upsert_many_with_admin_accounts([values]) > 0
+
+    async def upsert_many_with_admin_accounts(self, values_list: List[BaseModel],
+                                              chunk_size: int = BULK_INSERT_CHUNK_SIZE) -> int:
+        """
+        Пакетный вариант `upsert_with_admin_account`: один запрос на каждые `chunk_size` пользователей.
+
+        Параметры:
+            values_list (List[BaseModel]): Данные пользователей с одинаковым набором полей
+                и уникальными telegram_id.
+            chunk_size (int): Максимальное количество пользователей в одном запросе.
+
+        Возвращает:
+            int: Количество созданных пользователей.
+        """
+        # Порядок по telegram_id — одинаковый порядок блокировок строк в параллельных транзакциях
+        values_dicts = sorted((values.model_dump(exclude_unset=True) for values in values_list),
+                              key=lambda values: values['telegram_id'])
+        logger.debug(f"Регистрация/актуализация пользователей. Количество: {len(values_dicts)}")
+        try:
+            created_count = 0
+            for offset in range(0, len(values_dicts), chunk_size):
+                chunk = values_dicts[offset:offset + chunk_size]
+                result = await self._session.execute(self._upsert_with_admin_accounts_query(chunk))
+                await self._invalidate_caches(*chunk)
+                if result.rowcount > 0:
+                    await AdminDAO(self._session)._invalidate_caches(*chunk)
+                created_count += result.rowcount
+            logger.debug(f"Создано {created_count} пользователей, актуализировано не более {len(values_dicts) - created_count}.")
+            return created_count
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при регистрации пользователей: {e}")
+            raise
+
+    async def update_profiles(self, values_list: List[BaseModel], chunk_size: int = BULK_UPDATE_CHUNK_SIZE) -> int:
+        """
+        Актуализирует профили уже зарегистрированных пользователей по telegram_id (без регистрации новых).
+
+        Одна пачка — один запрос `UPDATE ... FROM (VALUES ...)`; строки без изменений не обновляются.
+        Пачки упорядочены по telegram_id, чтобы параллельные сбросы из нескольких процессов
+        блокировали строки в одном порядке.
+
+        Параметры:
+            values_list (List[BaseModel]): Данные профилей с одинаковым набором полей (включая telegram_id).
+            chunk_size (int): Максимальное количество пользователей в одном запросе.
+
+        Возвращает:
+            int: Количество обновлённых пользователей.
+        """
+        values_dicts = sorted((values.model_dump(exclude_unset=True) for values in values_list),
+                              key=lambda values: values['telegram_id'])
+        if not values_dicts:
+            return 0
+        columns = tuple(sorted(key for key in values_dicts[0] if key != 'telegram_id'))
+        logger.debug(f"Актуализация профилей пользователей. Количество: {len(values_dicts)}")
+        try:
+            updated_count = 0
+            for offset in range(0, len(values_dicts), chunk_size):
+                chunk = values_dicts[offset:offset + chunk_size]
+                rows = [(values['telegram_id'], *(values[name] for name in columns)) for values in chunk]
+                result = await self._bulk_update_chunk(columns, rows, returning=False, synchronize_session=False,
+                                                       key='telegram_id', only_changed=True)
+                await self._invalidate_caches(*chunk)
+                updated_count += result.rowcount
+            logger.debug(f"Обновлено {updated_count} профилей пользователей.")
+            return updated_count
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при актуализации профилей пользователей: {e}")
+            raise
+
+    def _upsert_with_admin_accounts_query(self, values_dicts: List[dict]):
+        upserted_user = (
+            self._upsert_query(values_dicts, conflict_columns=('telegram_id',))
+            .returning(TgUser.telegram_id, literal_column('xmax = 0').label('inserted'))
+            .cte('upserted_user')
+        )
+        # Python-дефолты AdminAccount передаются в SELECT явно: при from_select + CTE они не подставляются
+        admin_defaults = [column for column in AdminAccount.__table__.columns
+                          if column.default is not None and column.default.is_scalar]
+        return (
+            pg_insert(AdminAccount)
+            .from_select(['telegram_id', *[column.key for column in admin_defaults]],
+                         select(upserted_user.c.telegram_id,
+                                *[literal(column.default.arg, column.type) for column in admin_defaults])
+                         .where(upserted_user.c.inserted),
+                         include_defaults=False)
+            .add_cte(upserted_user, nest_here=True)
+        )
 
 
 class AdminDAO(BaseDAO[AdminAccount], TelegramIDMixin):
     model = AdminAccount
+    snapshot_schema = SAdmin
+    identity_cache = IdentityCache(key_field='telegram_id',
+                                   maxsize=settings.IDENTITY_CACHE_MAXSIZE,
+                                   ttl=settings.IDENTITY_CACHE_TTL)
+    # Права администраторов меняются редко — чтения обслуживаются из кеша запросов
+    query_cache = query_cache
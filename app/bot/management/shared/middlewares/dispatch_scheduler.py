@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.methods import TelegramMethod
+from aiogram.types import Update
+
+from app.bot.backpressure import Backpressure
+from app.bot.dispatch_scheduler import DispatchScheduler
+
+logger = logging.getLogger(__name__)
+
+# Ключ данных feed_update: дождаться окончания обработки (воркер очереди подтверждает апдейт только после неё)
+WAIT_DISPATCH_KEY = 'wait_dispatch'
+
+
+class DispatchSchedulerMiddleware(BaseMiddleware):
+    """
+    Outer middleware апдейтов: ставит обработку апдейта в очередь его чата в `DispatchScheduler`
+    и сразу возвращает управление (polling продолжает получать апдейты, лимит параллельности — у планировщика).
+    При перегрузке (`Backpressure`) ожидает снижения нагрузки, приостанавливая получение апдейтов.
+    """
+
+    def __init__(self, scheduler: DispatchScheduler, backpressure: Backpressure | None = None):
+        self.scheduler = scheduler
+        self.backpressure = backpressure
+
+    async def __call__(self,
+                       handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+                       event: Update,
+                       data: Dict[str, Any]
+                       ) -> Any:
+        chat = data.get('event_chat')
+        user = data.get('event_from_user')
+        key = chat.id if chat is not None else user.id if user is not None else None
+
+        if self.backpressure is not None:
+            await self.backpressure.wait_capacity()
+        future = self.scheduler.submit(key, lambda: self._handle(handler, event, data))
+        if data.get(WAIT_DISPATCH_KEY):
+            return await future
+        future.add_done_callback(lambda done: self._log_failure(event, done))
+        return None
+
+    @staticmethod
+    async def _handle(handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+                      event: Update, data: Dict[str, Any]) -> Any:
+        response = await handler(event, data)
+        # Как и aiogram при обработке в задачах: метод, возвращённый хендлером, выполняется отдельным запросом
+        if isinstance(response, TelegramMethod):
+            bot: Bot = data['bot']
+            try:
+                await bot(response)
+            except Exception as e:
+                logger.error(f"Не удалось выполнить ответ хендлера на апдейт {event.update_id}: {e}")
+        return response
+
+    @staticmethod
+    def _log_failure(event: Update, future: asyncio.Future) -> None:
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Ошибка при обработке апдейта {event.update_id}: {error!r}", exc_info=error)
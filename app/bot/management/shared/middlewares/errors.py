@@ -4,6 +4,9 @@ import asyncio
 import traceback
 import logging
 
+from app.main_dao.db_budget import is_db_timeout_error
+from app.main_dao.db_resilience import DatabaseUnavailableError
+
 logger = logging.getLogger(__name__)
 
 class ErrorHandlingMiddleware(BaseMiddleware):
@@ -11,8 +14,15 @@ class ErrorHandlingMiddleware(BaseMiddleware):
         try:
             return await handler(event, data)
         except Exception as e:
-            logger.critical(f"При обработке действия пользователя возникла ошибка: {e} \n{traceback.format_exc()}")
-            text_notify = "⚠️ Произошла ошибка при обработке вашего запроса.\nОтладочная информация была записана в лог!"
+            if isinstance(e, DatabaseUnavailableError):
+                logger.warning(f"БД недоступна, действие пользователя отклонено: {e}")
+                text_notify = "⏳ Сервис временно недоступен, повторите запрос чуть позже."
+            elif is_db_timeout_error(e):
+                logger.warning(f"Превышен бюджет времени запроса к БД при обработке действия пользователя: {e}")
+                text_notify = "⏳ Сервис сейчас перегружен, повторите запрос чуть позже."
+            else:
+                logger.critical(f"При обработке действия пользователя возникла ошибка: {e} \n{traceback.format_exc()}")
+                text_notify = "⚠️ Произошла ошибка при обработке вашего запроса.\nОтладочная информация была записана в лог!"
             if isinstance(event, Message):
                 msg = await event.reply(text_notify)
                 await asyncio.sleep(10)
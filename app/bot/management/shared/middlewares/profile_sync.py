@@ -0,0 +1,19 @@
+from typing import Callable, Dict, Any, Awaitable, Union
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message, CallbackQuery
+
+from app.actions.services.profile_sync_service import profile_buffer
+
+
+class ProfileSyncMiddleware(BaseMiddleware):
+    """Передаёт профиль отправителя в write-behind буфер; запись в БД выполняет планировщик."""
+
+    async def __call__(self,
+                       handler: Callable[[Union[Message, CallbackQuery], Dict[str, Any]], Awaitable[Any]],
+                       event: Union[Message, CallbackQuery],
+                       data: Dict[str, Any]
+                       ) -> Any:
+        if event.from_user and not event.from_user.is_bot:
+            profile_buffer.capture(event.from_user)
+        return await handler(event, data)
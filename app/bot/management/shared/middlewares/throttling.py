@@ -6,6 +6,8 @@ from aiogram import BaseMiddleware, Bot
 from aiogram.types import Message, CallbackQuery
 from typing import Callable, Dict, Any, Awaitable, Union
 
+from app.bot.rate_limiter import outbound_priority, Priority
+
 logger = logging.getLogger(__name__)
 
 
@@ -50,7 +52,9 @@ class ThrottlingMiddleware(BaseMiddleware):
                                show_alert=True)
 
     def _run_cooldown_feedback_loop(self, bot: Bot, event: Message, user_id: int, message: Message):
-        asyncio.create_task(self._update_cooldown_message(bot, event, user_id, message))
+        # Обратный отсчёт второстепенен: задача наследует низкий приоритет исходящих запросов
+        with outbound_priority(Priority.LOW):
+            asyncio.create_task(self._update_cooldown_message(bot, event, user_id, message))
 
     async def _update_cooldown_message(self, bot: Bot, event: Message, user_id: int, message: Message):
         try:
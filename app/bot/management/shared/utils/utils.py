@@ -8,6 +8,7 @@ from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 
+from app.bot.rate_limiter import outbound_priority, Priority
 from app.config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -98,13 +99,15 @@ async def animate_waiting_message(event: CallbackQuery | Message, signature: str
 
     cycle = 0
     try:
-        while max_cycles is None or cycle < max_cycles:
-            await asyncio.sleep(interval)
-            try:
-                await message.edit_text(f"{next(emojis)} <b>{signature}{next(dots)}</b>")
-            except TelegramBadRequest:
-                pass
-            cycle += 1
+        # Кадры анимации уступают лимит отправки остальным сообщениям
+        with outbound_priority(Priority.LOW):
+            while max_cycles is None or cycle < max_cycles:
+                await asyncio.sleep(interval)
+                try:
+                    await message.edit_text(f"{next(emojis)} <b>{signature}{next(dots)}</b>")
+                except TelegramBadRequest:
+                    pass
+                cycle += 1
     finally:
         if finish_text:
             try:
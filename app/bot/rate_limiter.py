@@ -0,0 +1,287 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Iterator
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from cachetools import LRUCache
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_KEY = 'global'
+# Методы, на которые распространяются лимиты Telegram на отправку сообщений
+LIMITED_METHOD_PREFIXES = ('send', 'copyMessage', 'forwardMessage', 'editMessage')
+UNLIMITED_METHODS = frozenset({'sendChatAction'})
+# Токены чата, которые запросы Priority.LOW оставляют нетронутыми для ответов NORMAL/HIGH
+LOW_PRIORITY_CHAT_RESERVE = 1
+
+# Token bucket в Redis: время — часы сервера Redis, общее для всех процессов. Возвращает ожидание (сек) строкой,
+# так как дробные числа Lua в ответе Redis усекаются до целых
+TAKE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rate, capacity, reserve = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'blocked')
+local blocked = tonumber(state[3]) or 0
+if blocked > now then
+    return tostring(blocked - now)
+end
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate)
+local wait = 0
+if tokens >= 1 + reserve then
+    tokens = tokens - 1
+else
+    wait = (1 + reserve - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return tostring(wait)
+"""
+BLOCK_SCRIPT = """
+local t = redis.call('TIME')
+local blocked = tonumber(t[1]) + tonumber(t[2]) / 1000000 + tonumber(ARGV[1])
+if blocked > (tonumber(redis.call('HGET', KEYS[1], 'blocked')) or 0) then
+    redis.call('HSET', KEYS[1], 'blocked', tostring(blocked))
+    redis.call('PEXPIRE', KEYS[1], math.ceil(tonumber(ARGV[1]) * 1000) + 1000)
+end
+return 1
+"""
+
+
+class Priority(IntEnum):
+    """Класс приоритета исходящего запроса: при нехватке глобального лимита первыми отправляются более приоритетные."""
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+current_priority: ContextVar[Priority] = ContextVar('outbound_priority', default=Priority.NORMAL)
+
+
+@contextmanager
+def outbound_priority(priority: Priority) -> Iterator[None]:
+    """Задаёт приоритет запросов к Telegram, выполняемых в блоке (например, рассылок — Priority.LOW)."""
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+class LocalBucketStore:
+    """Token bucket'ы в памяти процесса: {ключ: [токены, время обновления, заблокирован до]}."""
+
+    def __init__(self, maxsize: int = 100000):
+        self._buckets: LRUCache = LRUCache(maxsize=maxsize)
+
+    async def take(self, key: str, rate: float, capacity: float, reserve: float = 0) -> float:
+        """
+        Забирает токен, если после этого в bucket останется не меньше `reserve` токенов;
+        иначе ничего не забирает и возвращает время ожидания (сек).
+        """
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [capacity, now, 0.0]
+        if bucket[2] > now:
+            return bucket[2] - now
+        bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if bucket[0] >= 1 + reserve:
+            bucket[0] -= 1
+            return 0.0
+        return (1 + reserve - bucket[0]) / rate
+
+    async def block(self, key: str, seconds: float) -> None:
+        now = time.monotonic()
+        bucket = self._buckets.setdefault(key, [0.0, now, 0.0])
+        bucket[2] = max(bucket[2], now + seconds)
+
+
+class RedisBucketStore:
+    """
+    Token bucket'ы в Redis: лимиты общие для всех процессов с одним токеном бота (основной процесс, воркеры).
+    При недоступности Redis используется локальное хранилище.
+    """
+
+    def __init__(self, redis: Redis, prefix: str, fallback: LocalBucketStore):
+        self.redis = redis
+        self.prefix = prefix
+        self.fallback = fallback
+        self._take_script = redis.register_script(TAKE_SCRIPT)
+        self._block_script = redis.register_script(BLOCK_SCRIPT)
+        self.fallbacks = 0
+
+    async def take(self, key: str, rate: float, capacity: float, reserve: float = 0) -> float:
+        try:
+            return float(await self._take_script(keys=[f"{self.prefix}:{key}"], args=[rate, capacity, reserve]))
+        except RedisError as e:
+            self.fallbacks += 1
+            logger.warning(f"Лимитер Telegram: Redis недоступен, используется локальный лимит: {e}")
+            return await self.fallback.take(key, rate, capacity, reserve)
+
+    async def block(self, key: str, seconds: float) -> None:
+        await self.fallback.block(key, seconds)
+        try:
+            await self._block_script(keys=[f"{self.prefix}:{key}"], args=[seconds])
+        except RedisError as e:
+            self.fallbacks += 1
+            logger.warning(f"Лимитер Telegram: не удалось передать паузу retry_after в Redis: {e}")
+
+
+class OutboundRateLimiter:
+    """
+    Ограничение исходящих сообщений Telegram: глобальный token bucket и bucket на каждый чат
+    (личный чат — `private_rate` в секунду, группа/канал — `group_rate` в секунду).
+
+    Запрос сначала ждёт токен своего чата, затем — глобальный токен; глобальные токены выдаются
+    ожидающим в порядке приоритета (`Priority`), при равном приоритете — в порядке очереди.
+    Запросы Priority.LOW (анимации, обратный отсчёт) не расходуют последние `LOW_PRIORITY_CHAT_RESERVE`
+    токенов чата: настоящий ответ хендлера в том же чате не ждёт за ними.
+    """
+
+    def __init__(self, store: LocalBucketStore | RedisBucketStore, global_rate: float, private_rate: float,
+                 group_rate: float, chat_burst: int):
+        self.store = store
+        self.global_rate = global_rate
+        self.private_rate = private_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        self._waiters: list[tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._turn = asyncio.Condition()
+        self.requests = 0
+        self.delayed = 0
+        self.wait_time_total = 0.0
+        self.retry_after_count = 0
+
+    @staticmethod
+    def is_group(chat_id: int | str) -> bool:
+        # id групп и каналов отрицательные, каналы также адресуются по @username
+        return isinstance(chat_id, str) or chat_id < 0
+
+    async def acquire(self, chat_id: int | str | None, priority: Priority = Priority.NORMAL) -> None:
+        self.requests += 1
+        started_at = time.monotonic()
+        if chat_id is not None:
+            rate = self.group_rate if self.is_group(chat_id) else self.private_rate
+            reserve = min(LOW_PRIORITY_CHAT_RESERVE, self.chat_burst - 1) if priority == Priority.LOW else 0
+            await self._wait_bucket(f"chat:{chat_id}", rate, self.chat_burst, reserve)
+        await self._acquire_global(priority)
+        waited = time.monotonic() - started_at
+        if waited > 0.001:
+            self.delayed += 1
+            self.wait_time_total += waited
+
+    async def _wait_bucket(self, key: str, rate: float, capacity: float, reserve: float = 0) -> None:
+        while (delay := await self.store.take(key, rate, capacity, reserve)) > 0:
+            await asyncio.sleep(delay)
+
+    async def _acquire_global(self, priority: Priority) -> None:
+        entry = (int(priority), next(self._sequence))
+        async with self._turn:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    if self._waiters[0] != entry:
+                        await self._turn.wait()
+                        continue
+                    delay = await self.store.take(GLOBAL_KEY, self.global_rate, self.global_rate)
+                    if delay <= 0:
+                        return
+                    # Пробуждение раньше срока — если пришёл более приоритетный запрос
+                    try:
+                        await asyncio.wait_for(self._turn.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._turn.notify_all()
+
+    async def pause(self, chat_id: int | str | None, seconds: float) -> None:
+        """Приостанавливает отправку в чат (или всю отправку) на `retry_after` секунд после ответа 429."""
+        self.retry_after_count += 1
+        await self.store.block(f"chat:{chat_id}" if chat_id is not None else GLOBAL_KEY, seconds)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "delayed": self.delayed,
+            "wait_time_total": round(self.wait_time_total, 3),
+            "waiting_global": len(self._waiters),
+            "retry_after": self.retry_after_count,
+            "redis_fallbacks": getattr(self.store, 'fallbacks', 0),
+        }
+
+
+class RateLimitRequestMiddleware(BaseRequestMiddleware):
+    """
+    Middleware сессии бота: перед отправкой сообщения ждёт лимита `OutboundRateLimiter`,
+    а на `TelegramRetryAfter` приостанавливает отправку в чат на retry_after и повторяет запрос
+    (не более `max_retries` раз и если пауза не длиннее `max_retry_after` секунд).
+    Для методов вне лимитов (answerCallbackQuery и т.п.) пауза локальная: bucket'ы отправки не блокируются.
+    """
+
+    def __init__(self, limiter: OutboundRateLimiter, max_retries: int, max_retry_after: float):
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+
+    @staticmethod
+    def is_limited(method: TelegramMethod) -> bool:
+        api_method = method.__api_method__
+        return api_method.startswith(LIMITED_METHOD_PREFIXES) and api_method not in UNLIMITED_METHODS
+
+    async def __call__(self,
+                       make_request: NextRequestMiddlewareType[TelegramType],
+                       bot: Bot,
+                       method: TelegramMethod[TelegramType]
+                       ) -> Response[TelegramType]:
+        limited = self.is_limited(method)
+        chat_id = getattr(method, 'chat_id', None)
+        attempt = 0
+        while True:
+            if limited:
+                await self.limiter.acquire(chat_id, current_priority.get())
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if limited:
+                    await self.limiter.pause(chat_id, e.retry_after)
+                attempt += 1
+                if attempt > self.max_retries or e.retry_after > self.max_retry_after:
+                    raise
+                logger.warning(f"Telegram: {method.__api_method__} в чат {chat_id} — flood control, "
+                               f"повтор через {e.retry_after} сек (попытка {attempt}/{self.max_retries}).")
+                if not limited:
+                    await asyncio.sleep(e.retry_after)
+
+
+def create_rate_limiter() -> OutboundRateLimiter:
+    store = LocalBucketStore()
+    if settings.TELEGRAM_RATE_LIMIT_REDIS:
+        store = RedisBucketStore(Redis.from_url(settings.REDIS_URL), prefix="bot:rate_limit", fallback=store)
+    return OutboundRateLimiter(store=store,
+                               global_rate=settings.TELEGRAM_GLOBAL_RATE,
+                               private_rate=settings.TELEGRAM_PRIVATE_CHAT_RATE,
+                               group_rate=settings.TELEGRAM_GROUP_CHAT_RATE_PER_MINUTE / 60,
+                               chat_burst=settings.TELEGRAM_CHAT_BURST)
+
+
+outbound_rate_limiter = create_rate_limiter()
@@ -0,0 +1,247 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from aiogram import Bot
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.methods import GetUpdates
+from aiogram.types import Update
+from aiogram.utils.backoff import Backoff, BackoffConfig
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, ResponseError
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+POLLING_BACKOFF = BackoffConfig(min_delay=1.0, max_delay=5.0, factor=1.3, jitter=0.1)
+# Поле записи потока с JSON апдейта
+UPDATE_FIELD = 'update'
+
+
+class UpdateQueue:
+    """
+    Очередь апдейтов в Redis Streams, разбитая на `partitions` потоков `{prefix}:{n}`.
+
+    Апдейт попадает в партицию по id пользователя (или чата, если пользователя нет), поэтому все апдейты
+    одного пользователя читаются одним воркером по порядку: FSM и порядок действий в чате сохраняются.
+    Каждый поток читается через группу потребителей `group`: обработанные записи подтверждаются XACK,
+    неподтверждённые остаются в pending и забираются после сбоя воркера.
+    Число партиций нельзя менять, пока в потоках есть необработанные записи.
+    """
+
+    def __init__(self, redis: Redis, prefix: str, partitions: int, group: str, maxlen: int):
+        self.redis = redis
+        self.prefix = prefix
+        self.partitions = partitions
+        self.group = group
+        self.maxlen = maxlen
+        self.dead_letter_stream = f"{prefix}:dead"
+        self.published = 0
+
+    def stream(self, partition: int) -> str:
+        return f"{self.prefix}:{partition}"
+
+    @staticmethod
+    def partition_key(update: Update) -> int:
+        context = UserContextMiddleware.resolve_event_context(update)
+        if context.user is not None:
+            return context.user.id
+        if context.chat is not None:
+            return context.chat.id
+        return update.update_id
+
+    def partition_of(self, update: Update) -> int:
+        return self.partition_key(update) % self.partitions
+
+    async def publish(self, update: Update, raw: str | bytes | None = None) -> str:
+        """
+        Добавляет апдейт в поток его партиции.
+
+        Args:
+            update (Update): Апдейт (для выбора партиции)
+            raw (str | bytes | None): Исходный JSON апдейта; если не передан — сериализуется из `update`
+
+        Returns:
+            str: Id записи в потоке
+        """
+        if raw is None:
+            raw = update.model_dump_json(exclude_unset=True, by_alias=True)
+        entry_id = await self.redis.xadd(self.stream(self.partition_of(update)), {UPDATE_FIELD: raw},
+                                         maxlen=self.maxlen, approximate=True)
+        self.published += 1
+        return entry_id
+
+    async def ensure_group(self, partition: int) -> None:
+        try:
+            await self.redis.xgroup_create(self.stream(partition), self.group, id='0', mkstream=True)
+        except ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    async def run_polling(self, bot: Bot, allowed_updates: list[str], polling_timeout: int = 30) -> None:
+        """
+        Получает апдейты через getUpdates и публикует их в очередь вместо локальной обработки.
+        Смещение подтверждается Telegram только следующим запросом, то есть после публикации пакета:
+        при сбое апдейты будут получены повторно, а не потеряны.
+        """
+        backoff = Backoff(config=POLLING_BACKOFF)
+        offset = None
+        logger.info(f"Получение апдейтов в очередь Redis Streams ({self.partitions} партиций).")
+        while True:
+            try:
+                updates = await bot(GetUpdates(offset=offset, timeout=polling_timeout,
+                                               allowed_updates=allowed_updates))
+                for update in updates:
+                    await self.publish(update)
+                    offset = update.update_id + 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка при получении апдейтов в очередь: {e}")
+                await backoff.asleep()
+                continue
+            backoff.reset()
+
+    async def lag(self) -> dict:
+        """Метрики партиций: длина потока, записи в pending и ещё не прочитанные группой (lag, Redis >= 7)."""
+        metrics = {}
+        for partition in range(self.partitions):
+            stream = self.stream(partition)
+            groups = await self.redis.xinfo_groups(stream) if await self.redis.exists(stream) else []
+            group = next((group for group in groups if _decode(group['name']) == self.group), {})
+            metrics[partition] = {
+                "length": await self.redis.xlen(stream),
+                "pending": group.get('pending', 0),
+                "lag": group.get('lag'),
+            }
+        return metrics
+
+    async def stats(self) -> dict:
+        partitions = await self.lag()
+        return {
+            "published": self.published,
+            "pending": sum(metrics["pending"] for metrics in partitions.values()),
+            "lag": sum(metrics["lag"] or 0 for metrics in partitions.values()),
+            "dead_letters": await self.redis.xlen(self.dead_letter_stream),
+            "partitions": partitions,
+        }
+
+
+class UpdateWorker:
+    """
+    Воркер очереди апдейтов: обрабатывает партиции `partition % count == index`.
+
+    Каждая партиция читается отдельной задачей строго последовательно. После запуска сначала
+    обрабатываются собственные неподтверждённые записи (имя потребителя постоянно: `worker-{index}`),
+    затем периодически забираются записи других потребителей, простаивающие дольше `claim_idle` секунд;
+    пока такие записи есть, новые записи партиции не читаются, чтобы не нарушить порядок.
+    Апдейт, обработка которого завершилась исключением, подтверждается и переносится в `{prefix}:dead`.
+    """
+
+    def __init__(self, queue: UpdateQueue, index: int, count: int, handle: Callable[[Update], Awaitable],
+                 decode: Callable[[str], Update], batch_size: int, claim_idle: float, block_timeout: float = 5):
+        self.queue = queue
+        self.index = index
+        self.count = count
+        self.handle = handle
+        self.decode = decode
+        self.batch_size = batch_size
+        self.claim_idle = claim_idle
+        self.block_timeout = block_timeout
+        self.consumer = f"worker-{index}"
+        self.partitions = [partition for partition in range(queue.partitions) if partition % count == index]
+        self._stopping = asyncio.Event()
+        self.processed = 0
+        self.failed = 0
+        self.reclaimed = 0
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def run(self) -> None:
+        logger.info(f"Воркер {self.consumer}: партиции {self.partitions}.")
+        await asyncio.gather(*(self._consume(partition) for partition in self.partitions))
+        logger.info(f"Воркер {self.consumer} остановлен: {self.stats()}")
+
+    async def _consume(self, partition: int) -> None:
+        stream = self.queue.stream(partition)
+        await self.queue.ensure_group(partition)
+        # Сначала собственный pending (записи, полученные до перезапуска), затем новые
+        read_id = '0'
+        loop = asyncio.get_running_loop()
+        next_claim_at = loop.time()
+        while not self._stopping.is_set():
+            try:
+                if loop.time() >= next_claim_at:
+                    if await self._reclaim(stream):
+                        # Записи, зависшие у других потребителей, старше новых: ждём, пока их можно будет забрать
+                        await asyncio.sleep(min(self.claim_idle, self.block_timeout))
+                        continue
+                    next_claim_at = loop.time() + self.claim_idle
+                response = await self.queue.redis.xreadgroup(
+                    self.queue.group, self.consumer, {stream: read_id}, count=self.batch_size,
+                    block=None if read_id == '0' else int(self.block_timeout * 1000)
+                )
+                entries = response[0][1] if response else []
+                if read_id == '0' and not entries:
+                    read_id = '>'
+                for entry_id, fields in entries:
+                    await self._process(stream, entry_id, fields)
+            except RedisError as e:
+                logger.error(f"Воркер {self.consumer}: ошибка Redis при обработке {stream}: {e}")
+                # Неподтверждённые записи остались в собственном pending — перечитываем его
+                read_id = '0'
+                await asyncio.sleep(self.block_timeout)
+
+    async def _reclaim(self, stream: str) -> int:
+        """
+        Забирает и обрабатывает записи других потребителей, простаивающие дольше `claim_idle`.
+
+        Returns:
+            int: Количество записей, оставшихся в pending у других потребителей
+        """
+        start_id = '0-0'
+        while True:
+            result = await self.queue.redis.xautoclaim(stream, self.queue.group, self.consumer,
+                                                       min_idle_time=int(self.claim_idle * 1000),
+                                                       start_id=start_id, count=self.batch_size)
+            start_id, entries = result[0], result[1]
+            if entries:
+                self.reclaimed += len(entries)
+                logger.warning(f"Воркер {self.consumer}: забрано {len(entries)} зависших записей из {stream}.")
+            for entry_id, fields in entries:
+                await self._process(stream, entry_id, fields)
+            if _decode(start_id) == '0-0':
+                break
+        pending = await self.queue.redis.xpending(stream, self.queue.group)
+        return sum(consumer['pending'] for consumer in pending['consumers']
+                   if _decode(consumer['name']) != self.consumer)
+
+    async def _process(self, stream: str, entry_id, fields: dict | None) -> None:
+        raw = (fields or {}).get(UPDATE_FIELD)
+        if raw is not None:
+            try:
+                await self.handle(self.decode(_decode(raw)))
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.exception(f"Воркер {self.consumer}: ошибка обработки {stream}/{_decode(entry_id)}: {e}")
+                await self.queue.redis.xadd(self.queue.dead_letter_stream,
+                                            {UPDATE_FIELD: raw, 'stream': stream, 'error': repr(e)},
+                                            maxlen=self.queue.maxlen, approximate=True)
+        await self.queue.redis.xack(stream, self.queue.group, entry_id)
+
+    def stats(self) -> dict:
+        return {"processed": self.processed, "failed": self.failed, "reclaimed": self.reclaimed}
+
+
+def _decode(value: str | bytes) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+update_queue = UpdateQueue(redis=Redis.from_url(settings.REDIS_URL, decode_responses=True),
+                           prefix=settings.UPDATE_QUEUE_PREFIX,
+                           partitions=settings.UPDATE_QUEUE_PARTITIONS,
+                           group=settings.UPDATE_QUEUE_GROUP,
+                           maxlen=settings.UPDATE_QUEUE_MAXLEN)
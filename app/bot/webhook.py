@@ -0,0 +1,59 @@
+import asyncio
+import logging
+
+from aiogram.types import Update
+
+from app.bot.create_bot import bot, dp
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Путь приёма апдейтов на FastAPI-приложении (app.api.v1.main:app, префикс /api/v1)
+WEBHOOK_PATH = "/telegram/webhook"
+WEBHOOK_SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+_background_updates: set[asyncio.Task] = set()
+
+
+def feed_update_in_background(update: Update) -> asyncio.Task:
+    """Передаёт апдейт диспетчеру в фоновой задаче, чтобы HTTP-ответ Telegram не ждал обработки."""
+    task = asyncio.create_task(_feed_update(update))
+    _background_updates.add(task)
+    task.add_done_callback(_background_updates.discard)
+    return task
+
+
+async def _feed_update(update: Update) -> None:
+    try:
+        await dp.feed_update(bot, update)
+    except Exception as e:
+        logger.exception(f"Ошибка при обработке апдейта {update.update_id} из вебхука: {e}")
+
+
+async def wait_background_updates(timeout: float = 30) -> None:
+    """Дожидается обработки уже принятых апдейтов (при остановке)."""
+    if _background_updates:
+        logger.info(f"Ожидание обработки {len(_background_updates)} апдейтов вебхука.")
+        await asyncio.wait(set(_background_updates), timeout=timeout)
+
+
+async def run_webhook(server_task: asyncio.Task) -> None:
+    """
+    Режим вебхука: регистрирует вебхук в Telegram и работает, пока запущен API-сервер,
+    который принимает апдейты маршрутом WEBHOOK_PATH (и обрабатывает их либо публикует в очередь апдейтов).
+    """
+    if not settings.WEBHOOK_BASE_URL or not settings.WEBHOOK_SECRET:
+        raise ValueError("Для режима вебхука нужны WEBHOOK_BASE_URL и WEBHOOK_SECRET.")
+
+    webhook_url = f"{settings.WEBHOOK_BASE_URL.rstrip('/')}/api/v1{WEBHOOK_PATH}"
+    await dp.emit_startup(bot=bot, bots=[bot], dispatcher=dp)
+    try:
+        await bot.set_webhook(url=webhook_url,
+                              secret_token=settings.WEBHOOK_SECRET,
+                              allowed_updates=dp.resolve_used_update_types(),
+                              drop_pending_updates=True)
+        logger.info(f"Вебхук установлен: {webhook_url}")
+        await server_task
+    finally:
+        await wait_background_updates()
+        await dp.emit_shutdown(bot=bot, bots=[bot], dispatcher=dp)
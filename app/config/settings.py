@@ -7,9 +7,109 @@ from typing import ClassVar
 class Settings(BaseSettings):
     BOT_TOKEN: str = ""
     POSTGRESQL_URL: str = ""
+    POSTGRESQL_REPLICA_URL: str = ""  # Необязательная реплика для read-only сессий
     REDIS_URL: str = ""
     API_V1_ENABLE_DEBUG: bool = True
 
+    # Пул соединений PostgreSQL (значения по умолчанию совпадают с умолчаниями SQLAlchemy/asyncpg)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30         # Таймаут ожидания свободного соединения, сек
+    DB_POOL_RECYCLE: int = -1           # Пересоздание соединений старше N секунд (-1 — отключено)
+    DB_POOL_PRE_PING: bool = False
+    DB_STATEMENT_CACHE_SIZE: int = 100  # Кеш подготовленных выражений asyncpg на соединение (0 — отключен)
+    # Подключение через pgbouncer в режиме transaction pooling: уникальные имена подготовленных выражений,
+    # DB_POOL_SIZE=0 — без локального пула (NullPool). Кеши выражений сохраняются только если pgbouncer
+    # поддерживает подготовленные выражения (>= 1.21, max_prepared_statements > 0)
+    DB_PGBOUNCER_MODE: bool = False
+    DB_PGBOUNCER_PREPARED_STATEMENTS: bool = False
+
+    # Реплика: допустимое отставание (сек) и период проверки; при превышении чтение идёт с primary
+    DB_REPLICA_MAX_LAG: float = 5
+    DB_REPLICA_CHECK_INTERVAL: float = 10
+
+    # Write-behind синхронизация профилей: период сброса (сек), досрочный сброс при N изменениях, размер кеша отпечатков
+    PROFILE_SYNC_FLUSH_INTERVAL: float = 5
+    PROFILE_SYNC_MAX_PENDING: int = 5000
+    PROFILE_SYNC_FINGERPRINT_CACHE_SIZE: int = 100000
+
+    # Внутрипроцессный кеш снимков пользователей/администраторов по telegram_id
+    IDENTITY_CACHE_MAXSIZE: int = 10000
+    IDENTITY_CACHE_TTL: float = 300
+
+    # Кеш результатов чтения BaseDAO (для DAO с query_cache): бэкенд memory | redis, TTL (сек), размер (для memory)
+    QUERY_CACHE_BACKEND: str = "memory"
+    QUERY_CACHE_TTL: float = 60
+    QUERY_CACHE_MAXSIZE: int = 10000
+
+    # Счётчики строк: период пересчёта (сек) и режим подсчёта пользователей в /ping (exact | estimated | maintained)
+    ROW_COUNT_REFRESH_INTERVAL: float = 60
+    PING_USER_COUNT_MODE: str = "maintained"
+
+    # Статистика SQL по апдейтам/API-запросам: порог медленного запроса и суммарного времени БД (сек),
+    # количество повторов одного выражения, после которого выводится предупреждение о N+1
+    DB_SLOW_QUERY_THRESHOLD: float = 0.2
+    DB_SLOW_TOTAL_THRESHOLD: float = 1.0
+    DB_N_PLUS_ONE_THRESHOLD: int = 5
+
+    # Бюджет времени запросов сессий по умолчанию (сек, 0 — без ограничения);
+    # хендлеры переопределяют флагами db_statement_timeout / db_lock_timeout, API — через get_session_with_budget
+    DB_STATEMENT_TIMEOUT: float = 0
+    DB_LOCK_TIMEOUT: float = 0
+
+    # Повторы операций run_in_session: число попыток, пауза с джиттером (сек), глобальный бюджет повторов
+    # (доля от числа операций, минимум в секунду, максимальный запас)
+    DB_RETRY_MAX_ATTEMPTS: int = 3
+    DB_RETRY_BASE_DELAY: float = 0.05
+    DB_RETRY_MAX_DELAY: float = 1.0
+    DB_RETRY_BUDGET_RATIO: float = 0.1
+    DB_RETRY_BUDGET_MIN_PER_SECOND: float = 1
+    DB_RETRY_BUDGET_MAX_TOKENS: float = 20
+
+    # Circuit breaker: ошибок соединения подряд до размыкания и время (сек) до пробной сессии
+    DB_BREAKER_FAILURE_THRESHOLD: int = 5
+    DB_BREAKER_RESET_TIMEOUT: float = 10
+
+    # Получение апдейтов: polling | webhook. Для webhook — публичный адрес API (без /api/v1) и секрет,
+    # который Telegram передаёт в заголовке X-Telegram-Bot-Api-Secret-Token (1-256 символов A-Z, a-z, 0-9, _ и -)
+    BOT_UPDATES_MODE: str = "polling"
+    WEBHOOK_BASE_URL: str = ""
+    WEBHOOK_SECRET: str = ""
+
+    # Обработка апдейтов: не более N одновременно, апдейты одного чата — по очереди (0 — задача aiogram на каждый апдейт)
+    DISPATCH_CONCURRENCY_LIMIT: int = 100
+    # Backpressure (при включённом лимите): при N апдейтах в очереди и обработке получение апдейтов приостанавливается
+    # до снижения до LOW_WATERMARK, вебхук отвечает 429; при ожидающих соединения пула БД или среднем времени обработки
+    # апдейта (сек) выше порогов перегрузкой считается уже превышение LOW_WATERMARK (вебхук отвечает 503)
+    DISPATCH_HIGH_WATERMARK: int = 1000
+    DISPATCH_LOW_WATERMARK: int = 200
+    DISPATCH_MAX_POOL_WAITERS: int = 5
+    DISPATCH_MAX_HANDLER_LATENCY: float = 2.0
+
+    # Исходящие сообщения Telegram: глобальный лимит (в секунду), лимит личного чата (в секунду) и группы (в минуту),
+    # запас токенов чата; повторы после 429 (не более N раз и если retry_after не длиннее M сек);
+    # общие лимиты для всех процессов бота через Redis
+    TELEGRAM_RATE_LIMIT_ENABLED: bool = True
+    TELEGRAM_GLOBAL_RATE: float = 30
+    TELEGRAM_PRIVATE_CHAT_RATE: float = 1
+    TELEGRAM_GROUP_CHAT_RATE_PER_MINUTE: float = 20
+    TELEGRAM_CHAT_BURST: int = 3
+    TELEGRAM_RETRY_AFTER_MAX_RETRIES: int = 2
+    TELEGRAM_RETRY_AFTER_MAX_WAIT: float = 30
+    TELEGRAM_RATE_LIMIT_REDIS: bool = False
+
+    # Очередь апдейтов в Redis Streams: процесс бота (polling/webhook) только публикует апдейты, обработку ведут
+    # воркеры `python -m app.worker --index i --count n`. Префикс и число партиций-потоков (апдейты распределяются
+    # по id пользователя; не менять при непустых потоках), группа потребителей, ограничение длины потока,
+    # размер пачки чтения и простой (сек), после которого чужие неподтверждённые записи забираются
+    UPDATE_QUEUE_ENABLED: bool = False
+    UPDATE_QUEUE_PREFIX: str = "bot:updates"
+    UPDATE_QUEUE_PARTITIONS: int = 16
+    UPDATE_QUEUE_GROUP: str = "workers"
+    UPDATE_QUEUE_MAXLEN: int = 100000
+    UPDATE_QUEUE_BATCH_SIZE: int = 50
+    UPDATE_QUEUE_CLAIM_IDLE: float = 60
+
     # Часовой пояс всего приложения и его аббревиатуры
     DEFAULT_TZ_NAME: ClassVar[str] = 'Europe/Moscow'
     DEFAULT_TZ_ABBR: ClassVar[str] = 'MSK'
@@ -1,5 +1,5 @@
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class _AdminBase(BaseModel):
@@ -16,3 +16,5 @@ class _AdminBase(BaseModel):
     is_active: bool | None = Field(default=False)
     created_at: datetime = Field(default=None)
     updated_at: datetime = Field(default=None)
+
+    model_config = ConfigDict(from_attributes=True)
@@ -75,3 +75,10 @@ def setup_logging(level=logging.INFO, datefmt='%d.%m.%Y %H:%M:%S'):
     rotating_handler.setFormatter(plain_formatter)
     rotating_handler.addFilter(filter_instance)
     root_logger.addHandler(rotating_handler)
+
+    # Отдельный файл для медленных SQL-запросов (app.main_dao.query_stats)
+    slow_query_handler = TimedRotatingFileHandler(filename=os.path.join(log_dir, "slow_queries.txt"), when='midnight',
+                                                  interval=1, backupCount=60, encoding='utf-8', utc=False)
+    slow_query_handler.suffix = "%d_%m_%Y"
+    slow_query_handler.setFormatter(plain_formatter)
+    logging.getLogger("app.slow_queries").addHandler(slow_query_handler)
@@ -1,58 +1,270 @@
+import uuid
 from contextlib import asynccontextmanager
-from typing import List, TypeVar, Generic, Type, Optional
+from typing import List, TypeVar, Generic, Type, Optional, Sequence, Any, AsyncIterator, Literal, Callable, Awaitable
 from pydantic import BaseModel
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.future import select
-from sqlalchemy import update as sqlalchemy_update, delete as sqlalchemy_delete, func
+from sqlalchemy.sql import Select
+from sqlalchemy.orm import Session, lazyload, make_transient_to_detached
+from sqlalchemy.orm.interfaces import ORMOption
+from sqlalchemy import event, inspect as sa_inspect, update as sqlalchemy_update, delete as sqlalchemy_delete, values as sqlalchemy_values, func, or_, column, cast
+from sqlalchemy.dialects.postgresql import insert as pg_insert, Insert as PgInsert
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.main_dao.database import Base, async_session_maker
+from app.main_dao.database import Base, async_session_maker, read_only_session_maker, replica_session_maker
+from app.main_dao.replica import replica_state
+from app.main_dao.identity_cache import IdentityCache
+from app.main_dao.query_cache import QueryCache, MISSING as QUERY_CACHE_MISSING
+from app.main_dao.row_counter import row_counter
+from app.main_dao.db_budget import set_session_budget
+from app.main_dao.db_resilience import (CONNECTED_KEY, DatabaseUnavailableError, db_circuit_breaker, db_retry_budget,
+                                        is_connection_error, is_retryable_error)
+from app.config.settings import settings
 import logging
-import sqlalchemy.exc
+import random
 import asyncio
 logger = logging.getLogger(__name__)
 T = TypeVar("T", bound=Base)
+R = TypeVar("R")
+# Стратегии synchronize_session для ORM UPDATE/DELETE; False — не синхронизировать identity map
+SynchronizeSession = Literal["auto", "fetch", "evaluate", False]
+
+BULK_UPDATE_CHUNK_SIZE = 1000
+BULK_INSERT_CHUNK_SIZE = 1000
+BULK_COPY_THRESHOLD = 10000
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_STREAM_YIELD_PER = 1000
+MAX_QUERY_PARAMS = 32767
+# Таблицы, изменённые через BaseDAO в текущей транзакции сессии (ключ session.info)
+WRITTEN_TABLES_KEY = 'dao_written_tables'
+# Ключи identity_cache, изменённые в текущей транзакции сессии: {кеш: множество ключей или None — весь кеш}
+DIRTY_IDENTITY_KEYS_KEY = 'dao_dirty_identity_keys'
+# Сессия читает с реплики (ключ session.info): прочитанное может отставать от primary и не кешируется
+REPLICA_SESSION_KEY = 'db_replica'
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _forget_written_tables(session: Session) -> None:
+    session.info.pop(WRITTEN_TABLES_KEY, None)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_identity_keys_after_commit(session: Session) -> None:
+    # Повторный сброс: между записью и коммитом конкурентное чтение могло закешировать старую версию строки
+    for cache, keys in session.info.pop(DIRTY_IDENTITY_KEYS_KEY, {}).items():
+        if keys is None:
+            cache.invalidate()
+            continue
+        for key in keys:
+            cache.invalidate(key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_identity_keys_after_rollback(session: Session) -> None:
+    session.info.pop(DIRTY_IDENTITY_KEYS_KEY, None)
 
 
 @asynccontextmanager
-async def async_session_scope(max_attempts=3):
+async def async_session_scope(read_only: bool = False, statement_timeout: float | None = None,
+                              lock_timeout: float | None = None, allow_replica: bool = True):
     """
-    Асинхронный контекстный менеджер для управления сессией SQLAlchemy
-    с автоматическим повтором при TimeoutError и корректным закрытием сессии.
+    Асинхронный контекстный менеджер для управления сессией SQLAlchemy с корректным закрытием сессии.
+
+    Сессии с `read_only=True` открывают транзакцию только для чтения (BEGIN READ ONLY) и завершают её откатом
+    при закрытии, без коммита. Такие сессии направляются на реплику, если она настроена и не отстаёт
+    (см. replica_state), иначе — на primary. `allow_replica=False` оставляет read-only сессию на primary —
+    для чтений, результат которых кешируется и не должен отставать от последних записей.
+
+    `statement_timeout` / `lock_timeout` (сек) ограничивают время запросов транзакций сессии (SET LOCAL);
+    по умолчанию — DB_STATEMENT_TIMEOUT / DB_LOCK_TIMEOUT из настроек (0 — без ограничения).
+
+    Сессии primary проходят через `db_circuit_breaker`: пока БД недоступна, scope сразу выбрасывает
+    `DatabaseUnavailableError`. Повторы здесь не выполняются — тело блока нельзя перезапустить;
+    для повторяемых операций используется `run_in_session`.
     """
-    for attempt in range(max_attempts):
-        _session = async_session_maker()
+    use_replica = read_only and allow_replica and replica_state.is_usable
+    probe = False if use_replica else db_circuit_breaker.before_session()
+    if use_replica:
+        _session = replica_session_maker()
+        _session.info[REPLICA_SESSION_KEY] = True
+    else:
+        _session = read_only_session_maker() if read_only else async_session_maker()
+    set_session_budget(_session,
+                       settings.DB_STATEMENT_TIMEOUT if statement_timeout is None else statement_timeout,
+                       settings.DB_LOCK_TIMEOUT if lock_timeout is None else lock_timeout)
+    connection_failed = False
+    try:
+        if read_only:
+            logger.debug(f"Read-only сессия БД начата{' (реплика)' if use_replica else ''}.")
+            yield _session
+            return
+        async with _session.begin():
+            logger.debug("Сессия БД успешно начата.")
+            yield _session
+    except Exception as e:
+        connection_failed = is_connection_error(e, connected=_session.info.get(CONNECTED_KEY, False))
+        logger.error(f"Исключение в сессии БД: {e}")
+        raise
+    finally:
+        if not use_replica:
+            db_circuit_breaker.after_session(probe, connected=_session.info.get(CONNECTED_KEY, False),
+                                             connection_failed=connection_failed)
+        await _session.close()
+        logger.debug("Сессия БД закрыта.")
+
+
+async def run_in_session(work: Callable[[AsyncSession], Awaitable[R]], read_only: bool = False,
+                         max_attempts: int | None = None, **scope_kwargs) -> R:
+    """
+    Выполняет `work(session)` в отдельной сессии (с коммитом, если `read_only=False`) и повторяет всю операцию
+    при временных ошибках: потеря/таймаут соединения, serialization failure, deadlock.
+
+    Пауза между попытками — экспоненциальная с полным джиттером (DB_RETRY_BASE_DELAY..DB_RETRY_MAX_DELAY),
+    количество повторов ограничено глобальным `db_retry_budget`. При открытом circuit breaker ошибка
+    `DatabaseUnavailableError` не повторяется. `work` должен быть безопасен для повторного выполнения.
+
+    Args:
+        work (Callable[[AsyncSession], Awaitable[R]]): Операция с БД
+        read_only (bool): Сессия только для чтения (см. async_session_scope)
+        max_attempts (int | None): Максимум попыток (по умолчанию DB_RETRY_MAX_ATTEMPTS)
+        **scope_kwargs: Параметры async_session_scope (statement_timeout, lock_timeout, allow_replica)
+
+    Returns:
+        Результат `work`
+    """
+    max_attempts = max_attempts or settings.DB_RETRY_MAX_ATTEMPTS
+    db_retry_budget.deposit()
+    for attempt in range(1, max_attempts + 1):
         try:
-            async with _session.begin():
-                logger.debug("Сессия БД успешно начата.")
-                yield _session
-                return
-        except sqlalchemy.exc.TimeoutError:
-            logger.warning(f"Попытка {attempt + 1} из {max_attempts} инициализации сессии не удалась из-за таймаута.")
-            if attempt < max_attempts - 1:
-                wait_time = 2 ** attempt
-                logger.info(f"Повтор через {wait_time} сек.")
-                await asyncio.sleep(wait_time)
-                continue
+            async with async_session_scope(read_only=read_only, **scope_kwargs) as session:
+                result = await work(session)
+                if not read_only:
+                    await session.commit()
+                return result
+        except DatabaseUnavailableError:
             raise
         except Exception as e:
-            logger.error(f"Исключение при открытии сессии: {e}")
-            raise
-        finally:
-            await _session.close()
-            logger.debug("Сессия БД закрыта.")
+            if attempt >= max_attempts or not is_retryable_error(e) or not db_retry_budget.try_spend():
+                raise
+            delay = random.uniform(0, min(settings.DB_RETRY_MAX_DELAY, settings.DB_RETRY_BASE_DELAY * 2 ** attempt))
+            logger.warning(f"Попытка {attempt} из {max_attempts} не удалась ({type(e).__name__}), "
+                           f"повтор через {delay:.3f} сек.")
+            await asyncio.sleep(delay)
 
 
 class BaseDAO(Generic[T]):
     model: Optional[Type[T]] = None
+    # Загрузчики связей по умолчанию: без eager-загрузки (lazy="selectin"/"joined" моделей не срабатывают).
+    # Связи при необходимости запрашиваются явно: options=[selectinload(...)] / [joinedload(...)]
+    # либо догружаются через `await obj.awaitable_attrs.<relationship>`
+    default_load_options: tuple[ORMOption, ...] = (lazyload('*'),)
+    # Кеш снимков записей (задаётся в дочернем классе) и Pydantic-схема снимка
+    identity_cache: Optional[IdentityCache] = None
+    snapshot_schema: Optional[Type[BaseModel]] = None
+    # Кеш результатов find_one_or_none / find_all / count (включается в дочернем классе, например `query_cache`
+    # из app.main_dao.query_cache) — для справочных данных, которые редко меняются
+    query_cache: Optional[QueryCache] = None
 
     def __init__(self, session: AsyncSession):
         self._session = session
         if self.model is None:
             raise ValueError("Модель должна быть указана в дочернем классе")
 
-    async def find_one_or_none_by_id(self, data_id: int):
+    async def _invalidate_caches(self, *values_dicts: dict) -> None:
+        """Сбрасывает кеши модели после записи: снимки в `identity_cache` и тег модели в `query_cache`."""
+        self._session.info.setdefault(WRITTEN_TABLES_KEY, set()).add(self.model.__tablename__)
+        self._invalidate_identity_cache(*values_dicts)
+        if self.query_cache is not None:
+            await self.query_cache.invalidate_in_session(self._session, self.model.__tablename__)
+
+    def _has_uncommitted_writes(self) -> bool:
+        """Изменялась ли таблица модели через DAO в текущей транзакции сессии."""
+        return self.model.__tablename__ in self._session.info.get(WRITTEN_TABLES_KEY, ())
+
+    def _is_replica_session(self) -> bool:
+        """Читает ли сессия с реплики (см. async_session_scope)."""
+        return self._session.info.get(REPLICA_SESSION_KEY, False)
+
+    def _invalidate_identity_cache(self, *values_dicts: dict) -> None:
+        """
+        Сбрасывает снимки в `identity_cache` для ключей из переданных словарей (фильтров или значений).
+        Если ключ определить нельзя, кеш модели очищается целиком. Сброс повторяется после коммита сессии.
+        """
+        if self.identity_cache is None:
+            return
+        key_field = self.identity_cache.key_field
+        dirty_keys = self._session.info.setdefault(DIRTY_IDENTITY_KEYS_KEY, {})
+        if not values_dicts or any(values.get(key_field) is None for values in values_dicts):
+            self.identity_cache.invalidate()
+            dirty_keys[self.identity_cache] = None
+            return
+        for values in values_dicts:
+            self.identity_cache.invalidate(values[key_field])
+        if dirty_keys.get(self.identity_cache, set()) is not None:
+            dirty_keys.setdefault(self.identity_cache, set()).update(values[key_field] for values in values_dicts)
+
+    def _select_query(self, columns: Sequence[Any] | None = None,
+                      options: Sequence[ORMOption] | None = None) -> Select:
+        """
+        Возвращает SELECT по всей модели либо только по указанным колонкам (атрибуты модели или их имена).
+        Проекция возвращает лёгкие строки (Row) без ORM-объектов и учёта в identity map.
+        Для выборки модели применяются загрузчики связей `options` (по умолчанию — `default_load_options`).
+        """
+        if not columns:
+            return select(self.model).options(*(self.default_load_options if options is None else options))
+        return select(*[getattr(self.model, item) if isinstance(item, str) else item for item in columns])
+
+    def _query_cache_key(self, method: str, filter_dict: dict, columns: Sequence[Any] | None = None,
+                         options: Sequence[ORMOption] | None = None, use_cache: bool = True) -> str | None:
+        """
+        Ключ `query_cache` для чтения либо None, если кеш не используется: он не включён для модели,
+        отключён вызовом, заданы нестандартные загрузчики связей или сессия уже меняла модель в текущей транзакции.
+        """
+        tag = self.model.__tablename__
+        if self.query_cache is None or not use_cache or options is not None or self._has_uncommitted_writes():
+            return None
+        projection = [item if isinstance(item, str) else str(item) for item in columns or ()]
+        return self.query_cache.make_key(tag, method, sorted(filter_dict.items()), projection)
+
+    async def _get_cached(self, cache_key: str | None, entity: bool) -> Any:
+        """
+        Результат из `query_cache` либо `QUERY_CACHE_MISSING`.
+        Объекты модели хранятся как словари колонок и возвращаются привязанными к сессии без запроса к БД.
+        """
+        if cache_key is None:
+            return QUERY_CACHE_MISSING
+        value = await self.query_cache.get(cache_key)
+        if value is QUERY_CACHE_MISSING or value is None or not entity:
+            return list(value) if isinstance(value, list) else value
+        if isinstance(value, list):
+            return [await self._merge_cached(item) for item in value]
+        return await self._merge_cached(value)
+
+    async def _cache_versions(self, cache_key: str | None) -> tuple | None:
+        """Версии тегов `query_cache`, взятые до запроса к БД (см. QueryCache.versions)."""
+        if cache_key is None:
+            return None
+        return await self.query_cache.versions((self.model.__tablename__,))
+
+    async def _set_cached(self, cache_key: str | None, value: Any, entity: bool, versions: tuple | None) -> None:
+        # Результаты реплики в общий кеш не попадают: реплика может отставать от последних записей
+        if cache_key is None or self._is_replica_session():
+            return
+        if entity and value is not None:
+            value = [self._cached_dict(record) for record in value] if isinstance(value, list) else self._cached_dict(value)
+        await self.query_cache.set(cache_key, value, tags=(self.model.__tablename__,), versions=versions)
+
+    def _cached_dict(self, record: T) -> dict:
+        return {attr.key: getattr(record, attr.key) for attr in sa_inspect(self.model).column_attrs}
+
+    async def _merge_cached(self, data: dict) -> T:
+        record = self.model(**data)
+        make_transient_to_detached(record)
+        return await self._session.merge(record, load=False)
+
+    async def find_one_or_none_by_id(self, data_id: int, options: Sequence[ORMOption] | None = None):
         try:
-            query = select(self.model).filter_by(id=data_id)
+            query = self._select_query(options=options).filter_by(id=data_id)
             result = await self._session.execute(query)
             record = result.scalar_one_or_none()
             logger.debug(f"Запись {self.model.__name__} с ID {data_id} {'найдена' if record else 'не найдена'}.")
@@ -61,32 +273,132 @@ class BaseDAO(Generic[T]):
             logger.error(f"Ошибка при поиске записи с ID {data_id}: {e}")
             raise
 
-    async def find_one_or_none(self, filters: BaseModel):
+    async def find_one_or_none(self, filters: BaseModel, columns: Sequence[Any] | None = None,
+                               options: Sequence[ORMOption] | None = None, use_cache: bool = True):
         filter_dict = filters.model_dump(exclude_unset=True)
         logger.debug(f"Поиск одной записи {self.model.__name__} по фильтрам: {filter_dict}")
         try:
-            query = select(self.model).filter_by(**filter_dict)
+            cache_key = self._query_cache_key('find_one_or_none', filter_dict, columns, options, use_cache)
+            record = await self._get_cached(cache_key, entity=not columns)
+            if record is not QUERY_CACHE_MISSING:
+                logger.debug(f"Запись {'найдена' if record else 'не найдена'} в кеше по фильтрам: {filter_dict}")
+                return record
+
+            versions = await self._cache_versions(cache_key)
+            query = self._select_query(columns, options).filter_by(**filter_dict)
             result = await self._session.execute(query)
-            record = result.scalar_one_or_none()
+            record = result.one_or_none() if columns else result.scalar_one_or_none()
             logger.debug(f"Запись {'найдена' if record else 'не найдена'} по фильтрам: {filter_dict}")
+            await self._set_cached(cache_key, record, entity=not columns, versions=versions)
             return record
         except SQLAlchemyError as e:
             logger.error(f"Ошибка при поиске записи по фильтрам {filter_dict}: {e}")
             raise
 
-    async def find_all(self, filters: BaseModel | None = None):
+    async def find_all(self, filters: BaseModel | None = None, columns: Sequence[Any] | None = None,
+                       options: Sequence[ORMOption] | None = None, use_cache: bool = True):
+        """
+        Ищет все записи по фильтрам.
+
+        Args:
+            filters (BaseModel | None): Фильтры (None — все записи)
+            columns (Sequence[Any] | None): Проекция, например `[TgUser.telegram_id]` — вернуть кортежи (Row)
+                только с этими колонками вместо объектов модели
+            options (Sequence[ORMOption] | None): Загрузчики связей, например `[selectinload(TgUser.admin_account)]`
+                (по умолчанию связи не загружаются)
+            use_cache (bool): Использовать `query_cache`, если он включён для модели
+
+        Returns:
+            Список объектов модели либо строк проекции
+        """
         filter_dict = filters.model_dump(exclude_unset=True) if filters else {}
         logger.debug(f"Поиск всех записей {self.model.__name__} по фильтрам: {filter_dict}")
         try:
-            query = select(self.model).filter_by(**filter_dict)
+            cache_key = self._query_cache_key('find_all', filter_dict, columns, options, use_cache)
+            records = await self._get_cached(cache_key, entity=not columns)
+            if records is not QUERY_CACHE_MISSING:
+                logger.debug(f"Найдено {len(records)} записей в кеше.")
+                return records
+
+            versions = await self._cache_versions(cache_key)
+            query = self._select_query(columns, options).filter_by(**filter_dict)
             result = await self._session.execute(query)
-            records = result.scalars().all()
+            records = list(result.all() if columns else result.scalars().all())
             logger.debug(f"Найдено {len(records)} записей.")
+            await self._set_cached(cache_key, records, entity=not columns, versions=versions)
             return records
         except SQLAlchemyError as e:
             logger.error(f"Ошибка при поиске всех записей по фильтрам {filter_dict}: {e}")
             raise
 
+    async def find_page(self, after_id: Any = None, limit: int = DEFAULT_PAGE_SIZE, order_by: str = 'id',
+                        filters: BaseModel | None = None, columns: Sequence[Any] | None = None,
+                        options: Sequence[ORMOption] | None = None):
+        """
+        Keyset-пагинация: возвращает следующую страницу записей после курсора `after_id`.
+
+        В отличие от OFFSET, стоимость запроса не растёт с номером страницы — используется индекс
+        по колонке сортировки (`WHERE order_by > after_id ORDER BY order_by LIMIT limit`).
+
+        Args:
+            after_id (Any): Значение колонки сортировки у последней записи предыдущей страницы (None — первая страница)
+            limit (int): Размер страницы
+            order_by (str): Уникальная колонка сортировки; префикс "-" — сортировка по убыванию
+            filters (BaseModel | None): Дополнительные фильтры
+            columns (Sequence[Any] | None): Проекция колонок (см. `find_all`)
+            options (Sequence[ORMOption] | None): Загрузчики связей (см. `find_all`)
+
+        Returns:
+            Список записей страницы; курсор следующей страницы — значение `order_by` у последней записи
+        """
+        filter_dict = filters.model_dump(exclude_unset=True) if filters else {}
+        descending = order_by.startswith('-')
+        order_column = getattr(self.model, order_by.lstrip('-'))
+        logger.debug(f"Поиск страницы {self.model.__name__} после {order_by}={after_id}, limit={limit}, фильтры: {filter_dict}")
+        try:
+            query = self._select_query(columns, options).filter_by(**filter_dict)
+            if after_id is not None:
+                query = query.where(order_column < after_id if descending else order_column > after_id)
+            query = query.order_by(order_column.desc() if descending else order_column.asc()).limit(limit)
+            result = await self._session.execute(query)
+            records = result.all() if columns else result.scalars().all()
+            logger.debug(f"На странице найдено {len(records)} записей.")
+            return records
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при поиске страницы после {order_by}={after_id} по фильтрам {filter_dict}: {e}")
+            raise
+
+    async def stream_all(self, filters: BaseModel | None = None, yield_per: int = DEFAULT_STREAM_YIELD_PER,
+                         order_by: str | None = None, columns: Sequence[Any] | None = None,
+                         options: Sequence[ORMOption] | None = None) -> AsyncIterator[Any]:
+        """
+        Асинхронный итератор по всем записям без загрузки результата целиком в память.
+        Строки читаются серверным курсором пачками по `yield_per` (требует открытой транзакции).
+
+        Args:
+            filters (BaseModel | None): Фильтры
+            yield_per (int): Количество строк, забираемых из курсора за раз
+            order_by (str | None): Колонка сортировки; префикс "-" — сортировка по убыванию
+            columns (Sequence[Any] | None): Проекция колонок (см. `find_all`)
+            options (Sequence[ORMOption] | None): Загрузчики связей (см. `find_all`)
+        """
+        filter_dict = filters.model_dump(exclude_unset=True) if filters else {}
+        logger.debug(f"Потоковое чтение записей {self.model.__name__} по фильтрам: {filter_dict}, yield_per={yield_per}")
+        query = self._select_query(columns, options).filter_by(**filter_dict).execution_options(yield_per=yield_per)
+        if order_by:
+            order_column = getattr(self.model, order_by.lstrip('-'))
+            query = query.order_by(order_column.desc() if order_by.startswith('-') else order_column.asc())
+        try:
+            if columns:
+                result = await self._session.stream(query)
+            else:
+                result = await self._session.stream_scalars(query)
+            async for record in result:
+                yield record
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при потоковом чтении записей по фильтрам {filter_dict}: {e}")
+            raise
+
     async def add(self, values: BaseModel):
         values_dict = values.model_dump(exclude_unset=True)
         logger.debug(f"Добавление записи {self.model.__name__} с параметрами: {values_dict}")
@@ -95,93 +407,397 @@ class BaseDAO(Generic[T]):
             self._session.add(new_instance)
             logger.debug(f"Запись {self.model.__name__} успешно добавлена.")
             await self._session.flush()
+            await self._invalidate_caches(values_dict)
             return new_instance
         except SQLAlchemyError as e:
             logger.error(f"Ошибка при добавлении записи: {e}")
             raise
 
-    async def add_many(self, instances: List[BaseModel]):
+    async def add_many(self, instances: List[BaseModel], return_instances: bool = True,
+                       skip_conflicts: bool = False, chunk_size: int = BULK_INSERT_CHUNK_SIZE):
+        """
+        Добавляет несколько записей.
+
+        По умолчанию записи создаются через ORM (`add_all` + `flush`) и возвращаются объекты модели.
+        Для больших пакетов используется bulk-режим без создания ORM-объектов:
+        многострочные `INSERT ... VALUES` пачками по `chunk_size`, а при `return_instances=False`
+        и размере пакета от `BULK_COPY_THRESHOLD` — COPY через asyncpg во временную таблицу.
+
+        Args:
+            instances (List[BaseModel]): Данные новых записей
+            return_instances (bool): Возвращать ли объекты модели (False — только количество вставленных строк)
+            skip_conflicts (bool): Пропускать строки, нарушающие ограничения уникальности (ON CONFLICT DO NOTHING)
+            chunk_size (int): Максимальное количество строк в одном INSERT
+
+        Returns:
+            Список объектов модели (только реально вставленных) либо количество вставленных строк
+        """
         values_list = [item.model_dump(exclude_unset=True) for item in instances]
         logger.debug(f"Добавление нескольких записей {self.model.__name__}. Количество: {len(values_list)}")
         try:
-            new_instances = [self.model(**values) for values in values_list]
-            self._session.add_all(new_instances)
-            logger.debug(f"Успешно добавлено {len(new_instances)} записей.")
+            if return_instances and not skip_conflicts:
+                new_instances = [self.model(**values) for values in values_list]
+                self._session.add_all(new_instances)
+                logger.debug(f"Успешно добавлено {len(new_instances)} записей.")
+                await self._session.flush()
+                await self._invalidate_caches(*values_list)
+                return new_instances
+
+            # Незафиксированные ORM-объекты должны попасть в БД раньше строк, вставленных в обход unit of work
             await self._session.flush()
-            return new_instances
+            groups = self._group_insert_rows(values_list)
+            if not return_instances and len(values_list) >= BULK_COPY_THRESHOLD:
+                inserted_count = 0
+                for columns, rows in groups.items():
+                    inserted_count += await self._copy_insert(columns, rows, skip_conflicts)
+                logger.debug(f"Успешно добавлено {inserted_count} записей через COPY.")
+                await self._invalidate_caches(*values_list)
+                return inserted_count
+
+            new_instances, inserted_count = [], 0
+            for columns, rows in groups.items():
+                group_chunk_size = max(1, min(chunk_size, MAX_QUERY_PARAMS // len(columns)))
+                for offset in range(0, len(rows), group_chunk_size):
+                    query = pg_insert(self.model).values(
+                        [dict(zip(columns, row)) for row in rows[offset:offset + group_chunk_size]])
+                    if skip_conflicts:
+                        query = query.on_conflict_do_nothing()
+                    if return_instances:
+                        result = await self._session.execute(
+                            query.returning(self.model).options(*self.default_load_options))
+                        new_instances.extend(result.scalars().all())
+                    else:
+                        result = await self._session.execute(query)
+                        inserted_count += result.rowcount
+            await self._invalidate_caches(*values_list)
+            if return_instances:
+                logger.debug(f"Успешно добавлено {len(new_instances)} записей.")
+                return new_instances
+            logger.debug(f"Успешно добавлено {inserted_count} записей.")
+            return inserted_count
         except SQLAlchemyError as e:
             logger.error(f"Ошибка при добавлении нескольких записей: {e}")
             raise
 
-    async def update(self, filters: BaseModel, values: BaseModel):
+    def _group_insert_rows(self, values_list: List[dict]) -> dict[tuple[str, ...], list[tuple]]:
+        """
+        Группирует строки по набору колонок, дополняя их Python-дефолтами модели
+        (COPY и многострочный VALUES не применяют `default=` из mapped_column).
+        """
+        scalar_defaults = {
+            table_column.key: table_column.default.arg
+            for table_column in self.model.__table__.columns
+            if table_column.default is not None and table_column.default.is_scalar
+        }
+        groups: dict[tuple[str, ...], list[tuple]] = {}
+        for values in values_list:
+            row = {**scalar_defaults, **values}
+            columns = tuple(sorted(row))
+            groups.setdefault(columns, []).append(tuple(row[name] for name in columns))
+        return groups
+
+    async def _copy_insert(self, columns: tuple[str, ...], rows: list[tuple], skip_conflicts: bool) -> int:
+        """
+        Вставляет строки через COPY (asyncpg `copy_records_to_table`) во временную таблицу
+        и переносит их в целевую одним `INSERT ... SELECT` в текущей транзакции.
+        """
+        connection = await self._session.connection()
+        preparer = connection.dialect.identifier_preparer
+        table_name = preparer.format_table(self.model.__table__)
+        staging_name = f"_bulk_{self.model.__table__.name}_{uuid.uuid4().hex[:12]}"
+        column_list = ", ".join(preparer.quote(name) for name in columns)
+
+        # Временная таблица создаётся через SQLAlchemy, поэтому COPY идёт внутри уже начатой транзакции
+        await connection.exec_driver_sql(
+            f"CREATE TEMP TABLE {staging_name} ON COMMIT DROP AS SELECT {column_list} FROM {table_name} WITH NO DATA")
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(staging_name, records=rows, columns=list(columns))
+        result = await connection.exec_driver_sql(
+            f"INSERT INTO {table_name} ({column_list}) SELECT {column_list} FROM {staging_name}"
+            f"{' ON CONFLICT DO NOTHING' if skip_conflicts else ''}")
+        await connection.exec_driver_sql(f"DROP TABLE {staging_name}")
+        return result.rowcount
+
+    def _upsert_query(self, values: dict | List[dict], conflict_columns: Sequence[str],
+                      update_columns: Sequence[str] | None = None) -> PgInsert:
+        """
+        Собирает INSERT ... ON CONFLICT DO UPDATE, который обновляет строку только при реальном изменении данных.
+
+        Args:
+            values (dict | List[dict]): Значения для вставки; список — многострочный VALUES
+                (словари с одинаковым набором ключей и уникальными значениями колонок конфликта)
+            conflict_columns (Sequence[str]): Колонки уникального ограничения для ON CONFLICT
+            update_columns (Sequence[str] | None): Колонки для обновления при конфликте
+                (по умолчанию — все переданные, кроме колонок конфликта)
+
+        Returns:
+            Insert: Запрос без RETURNING, пригодный для дальнейшей композиции
+        """
+        query = pg_insert(self.model).values(values)
+        if update_columns is None:
+            sample = values if isinstance(values, dict) else values[0]
+            update_columns = [k for k in sample if k not in conflict_columns]
+        if not update_columns:
+            return query.on_conflict_do_nothing(index_elements=list(conflict_columns))
+
+        set_values = {column: query.excluded[column] for column in update_columns}
+        if 'updated_at' not in set_values:
+            # onupdate не срабатывает для ON CONFLICT DO UPDATE, поэтому задаем явно
+            set_values['updated_at'] = func.now()
+        return query.on_conflict_do_update(
+            index_elements=list(conflict_columns),
+            set_=set_values,
+            where=or_(*[getattr(self.model, column).is_distinct_from(query.excluded[column])
+                        for column in update_columns])
+        )
+
+    async def upsert(self, values: BaseModel, conflict_columns: Sequence[str],
+                     update_columns: Sequence[str] | None = None, returning: bool | Sequence[str] = False):
+        """
+        Вставляет запись или обновляет существующую за один запрос (INSERT ... ON CONFLICT DO UPDATE).
+        Обновление (и перезапись updated_at) выполняется, только если хотя бы одна колонка
+        отличается от сохранённой (IS DISTINCT FROM).
+
+        Args:
+            values (BaseModel): Значения записи
+            conflict_columns (Sequence[str]): Колонки уникального ограничения
+            update_columns (Sequence[str] | None): Колонки для обновления при конфликте
+            returning (bool | Sequence[str]): True — вернуть объект модели, список имён колонок — вернуть строку
+                с этими колонками, False — вернуть количество затронутых строк
+
+        Returns:
+            Объект модели / строка / None (если запись не изменилась) либо количество затронутых строк
+        """
+        values_dict = values.model_dump(exclude_unset=True)
+        logger.debug(f"Upsert записи {self.model.__name__} по {list(conflict_columns)} с параметрами: {values_dict}")
+        try:
+            query = self._returning_query(self._upsert_query(values_dict, conflict_columns, update_columns),
+                                          returning)
+            result = await self._session.execute(query)
+            await self._invalidate_caches(values_dict)
+            if returning is True:
+                record = result.scalar_one_or_none()
+            elif returning:
+                record = result.one_or_none()
+            else:
+                logger.debug(f"Upsert затронул {result.rowcount} записей.")
+                return result.rowcount
+            logger.debug(f"Upsert {'изменил запись' if record else 'не изменил данных'}.")
+            return record
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при upsert записи: {e}")
+            raise
+
+    def _returning_query(self, query, returning: bool | Sequence[str]):
+        """
+        Добавляет к INSERT/UPDATE/DELETE предложение RETURNING.
+
+        True — объекты модели (с `default_load_options`), список имён колонок — только эти колонки.
+        """
+        if returning is True:
+            return query.returning(self.model).options(*self.default_load_options)
+        if returning:
+            return query.returning(*[getattr(self.model, column) for column in returning])
+        return query
+
+    @staticmethod
+    def _fetch_returning(result, returning: bool | Sequence[str]) -> list:
+        return list(result.scalars().all()) if returning is True else list(result.all())
+
+    async def update(self, filters: BaseModel, values: BaseModel, returning: bool | Sequence[str] = False,
+                     synchronize_session: SynchronizeSession = "fetch"):
+        """
+        Обновляет записи по фильтру.
+
+        Args:
+            filters (BaseModel): Фильтр записей
+            values (BaseModel): Новые значения
+            returning (bool | Sequence[str]): True — вернуть обновлённые объекты модели, список имён колонок —
+                вернуть строки с этими колонками (тем же запросом UPDATE ... RETURNING), False — вернуть количество
+            synchronize_session (SynchronizeSession): Стратегия синхронизации identity map сессии;
+                False — не синхронизировать (если загруженные в сессию объекты дальше не используются)
+
+        Returns:
+            Список объектов / строк либо количество обновлённых записей
+        """
         filter_dict = filters.model_dump(exclude_unset=True)
         values_dict = values.model_dump(exclude_unset=True)
         logger.debug(f"Обновление записей {self.model.__name__} по фильтру: {filter_dict} с параметрами: {values_dict}")
         try:
-            query = (
+            query = self._returning_query(
                 sqlalchemy_update(self.model)
                 .where(*[getattr(self.model, k) == v for k, v in filter_dict.items()])
                 .values(**values_dict)
-                .execution_options(synchronize_session="fetch")
+                .execution_options(synchronize_session=synchronize_session),
+                returning
             )
             result = await self._session.execute(query)
-            logger.debug(f"Обновлено {result.rowcount} записей.")
+            records = self._fetch_returning(result, returning) if returning else None
+            updated_count = len(records) if returning else result.rowcount
+            logger.debug(f"Обновлено {updated_count} записей.")
             await self._session.flush()
-            return result.rowcount
+            # При изменении самого ключевого поля кеш очищается целиком
+            changes_key = self.identity_cache is not None and self.identity_cache.key_field in values_dict
+            await self._invalidate_caches(*(() if changes_key else (filter_dict,)))
+            return records if returning else updated_count
         except SQLAlchemyError as e:
             logger.error(f"Ошибка при обновлении записей: {e}")
             raise
 
-    async def delete(self, filters: BaseModel):
+    async def delete(self, filters: BaseModel, returning: bool | Sequence[str] = False,
+                     synchronize_session: SynchronizeSession = "auto"):
+        """
+        Удаляет записи по фильтру.
+
+        Args:
+            filters (BaseModel): Фильтр записей (хотя бы одно поле)
+            returning (bool | Sequence[str]): True — вернуть удалённые объекты модели, список имён колонок —
+                вернуть строки с этими колонками (DELETE ... RETURNING), False — вернуть количество
+            synchronize_session (SynchronizeSession): Стратегия синхронизации identity map сессии
+
+        Returns:
+            Список объектов / строк либо количество удалённых записей
+        """
         filter_dict = filters.model_dump(exclude_unset=True)
         logger.debug(f"Удаление записей {self.model.__name__} по фильтру: {filter_dict}")
         if not filter_dict:
             logger.error("Нужен хотя бы один фильтр для удаления.")
             raise ValueError("Нужен хотя бы один фильтр для удаления.")
         try:
-            query = sqlalchemy_delete(self.model).filter_by(**filter_dict)
+            query = self._returning_query(
+                sqlalchemy_delete(self.model)
+                .filter_by(**filter_dict)
+                .execution_options(synchronize_session=synchronize_session),
+                returning
+            )
             result = await self._session.execute(query)
-            logger.debug(f"Удалено {result.rowcount} записей.")
+            records = self._fetch_returning(result, returning) if returning else None
+            deleted_count = len(records) if returning else result.rowcount
+            logger.debug(f"Удалено {deleted_count} записей.")
             await self._session.flush()
-            return result.rowcount
+            await self._invalidate_caches(filter_dict)
+            return records if returning else deleted_count
         except SQLAlchemyError as e:
             logger.error(f"Ошибка при удалении записей: {e}")
             raise
 
-    async def count(self, filters: BaseModel | None = None):
+    async def count(self, filters: BaseModel | None = None, use_cache: bool = True, approximate: bool = False):
+        """
+        Подсчитывает записи по фильтрам.
+
+        Args:
+            filters (BaseModel | None): Фильтры (None — все записи)
+            use_cache (bool): Использовать `query_cache`, если он включён для модели
+            approximate (bool): Для подсчёта без фильтров — взять значение `row_counter` (пересчитываемое
+                планировщиком или оценку pg_class.reltuples) вместо COUNT(*); с фильтрами подсчёт всегда точный
+
+        Returns:
+            int: Количество записей
+        """
         filter_dict = filters.model_dump(exclude_unset=True) if filters else {}
         logger.debug(f"Подсчет количества записей {self.model.__name__} по фильтру: {filter_dict}")
         try:
+            if approximate and not filter_dict:
+                count = await row_counter.count(self._session, self.model)
+                logger.debug(f"Приблизительно {count} записей.")
+                return count
+
+            cache_key = self._query_cache_key('count', filter_dict, use_cache=use_cache)
+            count = await self._get_cached(cache_key, entity=False)
+            if count is not QUERY_CACHE_MISSING:
+                logger.debug(f"Найдено {count} записей (кеш).")
+                return count
+
+            versions = await self._cache_versions(cache_key)
             query = select(func.count(self.model.id)).filter_by(**filter_dict)
             result = await self._session.execute(query)
             count = result.scalar()
             logger.debug(f"Найдено {count} записей.")
+            await self._set_cached(cache_key, count, entity=False, versions=versions)
             return count
         except SQLAlchemyError as e:
             logger.error(f"Ошибка при подсчете записей: {e}")
             raise
 
-    async def bulk_update(self, records: List[BaseModel]):
-        logger.debug(f"Массовое обновление записей {self.model.__name__}")
+    async def bulk_update(self, records: List[BaseModel], chunk_size: int = BULK_UPDATE_CHUNK_SIZE,
+                          returning: bool | Sequence[str] = False,
+                          synchronize_session: SynchronizeSession = "fetch"):
+        """
+        Массовое обновление записей по их ID.
+
+        Записи группируются по набору изменяемых колонок, и каждая группа отправляется
+        пачками по `chunk_size` строк одним запросом `UPDATE ... FROM (VALUES ...)`.
+        Записи без `id` или без изменяемых полей пропускаются; при повторе `id` используется последняя запись.
+
+        Args:
+            records (List[BaseModel]): Записи с `id` и обновляемыми полями
+            chunk_size (int): Максимальное количество строк в одном запросе
+            returning (bool | Sequence[str]): True — вернуть обновлённые объекты модели, список имён колонок —
+                вернуть строки с этими колонками (RETURNING каждой пачки), False — вернуть количество
+            synchronize_session (SynchronizeSession): Стратегия синхронизации identity map сессии
+
+        Returns:
+            Список объектов / строк либо количество обновлённых записей
+        """
+        logger.debug(f"Массовое обновление записей {self.model.__name__}. Количество: {len(records)}")
         try:
-            updated_count = 0
+            groups: dict[tuple[str, ...], dict] = {}
             for record in records:
                 record_dict = record.model_dump(exclude_unset=True)
                 if 'id' not in record_dict:
                     continue
 
                 update_data = {k: v for k, v in record_dict.items() if k != 'id'}
-                stmt = (
-                    sqlalchemy_update(self.model)
-                    .filter_by(id=record_dict['id'])
-                    .values(**update_data)
-                )
-                result = await self._session.execute(stmt)
-                updated_count += result.rowcount
+                if not update_data:
+                    continue
+                groups.setdefault(tuple(sorted(update_data)), {})[record_dict['id']] = update_data
+
+            updated_count = 0
+            updated_records = []
+            for columns, rows_by_id in groups.items():
+                rows = [(row_id, *(data[column] for column in columns)) for row_id, data in rows_by_id.items()]
+                # Ограничение протокола PostgreSQL на количество параметров в одном запросе
+                group_chunk_size = max(1, min(chunk_size, MAX_QUERY_PARAMS // (len(columns) + 1)))
+                for offset in range(0, len(rows), group_chunk_size):
+                    result = await self._bulk_update_chunk(columns, rows[offset:offset + group_chunk_size],
+                                                           returning, synchronize_session)
+                    if returning:
+                        chunk_records = self._fetch_returning(result, returning)
+                        updated_records.extend(chunk_records)
+                        updated_count += len(chunk_records)
+                    else:
+                        updated_count += result.rowcount
 
             logger.debug(f"Обновлено {updated_count} записей")
             await self._session.flush()
-            return updated_count
+            if groups:
+                await self._invalidate_caches()
+            return updated_records if returning else updated_count
         except SQLAlchemyError as e:
             logger.error(f"Ошибка при массовом обновлении: {e}")
             raise
+
+    async def _bulk_update_chunk(self, columns: tuple[str, ...], rows: list[tuple],
+                                 returning: bool | Sequence[str], synchronize_session: SynchronizeSession,
+                                 key: str = 'id', only_changed: bool = False):
+        """
+        UPDATE ... FROM (VALUES ...) по колонке `key` (первый элемент каждой строки `rows`).
+        `only_changed=True` — обновлять только строки, в которых значения действительно отличаются.
+        """
+        table_columns = self.model.__table__.c
+        data = (
+            sqlalchemy_values(*[column(name, table_columns[name].type) for name in (key, *columns)],
+                              name='bulk_data')
+            .data(rows)
+        )
+        stmt = (
+            sqlalchemy_update(self.model)
+            .where(getattr(self.model, key) == data.c[key])
+            # CAST нужен, если в колонке пачки только NULL: тогда PostgreSQL выводит для VALUES тип text
+            .values({name: cast(data.c[name], table_columns[name].type) for name in columns})
+            .execution_options(synchronize_session=synchronize_session)
+        )
+        if only_changed:
+            stmt = stmt.where(or_(*[getattr(self.model, name).is_distinct_from(cast(data.c[name], table_columns[name].type))
+                                    for name in columns]))
+        return await self._session.execute(self._returning_query(stmt, returning))
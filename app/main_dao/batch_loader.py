@@ -0,0 +1,80 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Hashable, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class BatchLoader:
+    """
+    Объединяет поиски по ключу, запрошенные конкурентными корутинами в одной итерации event loop,
+    в один вызов `load_many` (DataLoader).
+
+    `load(key)` ставит ключ в очередь и ждёт результат; пакет отправляется через `loop.call_soon`,
+    то есть после того, как все готовые к выполнению корутины текущей итерации успели добавить свои ключи.
+    Повторные запросы одного ключа в пакете разделяют один результат.
+    """
+
+    def __init__(self, load_many: Callable[[list], Awaitable[dict]], max_batch_size: int = 1000):
+        """
+        Args:
+            load_many (Callable[[list], Awaitable[dict]]): Загрузка пакета ключей; возвращает словарь
+                {ключ: значение}, отсутствующие ключи получают None
+            max_batch_size (int): Максимальное количество ключей в одном вызове `load_many`
+        """
+        self._load_many = load_many
+        self.max_batch_size = max_batch_size
+        self._pending: dict[Hashable, asyncio.Future] = {}
+        self._dispatch_scheduled = False
+        self._tasks: set[asyncio.Task] = set()
+        self.batches = 0
+        self.loads = 0
+
+    async def load(self, key: Hashable) -> Any:
+        self.loads += 1
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pending[key] = loop.create_future()
+            if not self._dispatch_scheduled:
+                self._dispatch_scheduled = True
+                loop.call_soon(self._dispatch)
+        # shield: отмена одного ожидающего не должна отменять результат для остальных
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: Sequence[Hashable]) -> list:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _dispatch(self) -> None:
+        self._dispatch_scheduled = False
+        batch, self._pending = self._pending, {}
+        items = list(batch.items())
+        for offset in range(0, len(items), self.max_batch_size):
+            task = asyncio.create_task(self._resolve(dict(items[offset:offset + self.max_batch_size])))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, batch: dict[Hashable, asyncio.Future]) -> None:
+        self.batches += 1
+        logger.debug(f"Пакетная загрузка {len(batch)} ключей.")
+        try:
+            results = await self._load_many(list(batch))
+        except asyncio.CancelledError:
+            for future in batch.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(results.get(key))
+
+    def stats(self) -> dict:
+        return {
+            "loads": self.loads,
+            "batches": self.batches,
+            "loads_per_batch": round(self.loads / self.batches, 2) if self.batches else 0.0,
+        }
@@ -3,11 +3,73 @@ from datetime import datetime
 from decimal import Decimal
 from sqlalchemy import inspect, TIMESTAMP, func
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine, AsyncSession
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine, AsyncSession, AsyncEngine
 from app.config.settings import settings
+from app.main_dao.db_resilience import register_connect_events
+from app.main_dao.pool_metrics import MeasuredAsyncQueuePool, PoolMetrics, register_pool_events
+from app.main_dao.query_stats import register_query_stats_events
 
-engine = create_async_engine(url=settings.POSTGRESQL_URL)
+
+
+def _prepared_statement_name() -> str:
+    return f"__asyncpg_{uuid.uuid4()}__"
+
+
+def _pool_kwargs(pgbouncer_mode: bool) -> dict:
+    # За pgbouncer локальный пул можно отключить (DB_POOL_SIZE=0): соединения держит сам pgbouncer
+    if pgbouncer_mode and settings.DB_POOL_SIZE <= 0:
+        return {"poolclass": NullPool}
+    return {
+        "poolclass": MeasuredAsyncQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+
+def _connect_args(pgbouncer_mode: bool) -> dict:
+    if not pgbouncer_mode:
+        return {"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    # В transaction pooling соседние транзакции попадают на разные серверные соединения:
+    # подготовленные выражения получают уникальные имена, чтобы не конфликтовать между клиентами.
+    # Кеши подготовленных выражений сохраняются, только если pgbouncer сам отслеживает их
+    # (pgbouncer >= 1.21, max_prepared_statements > 0)
+    cache_size = settings.DB_STATEMENT_CACHE_SIZE if settings.DB_PGBOUNCER_PREPARED_STATEMENTS else 0
+    return {
+        "statement_cache_size": cache_size,
+        "prepared_statement_cache_size": cache_size,
+        "prepared_statement_name_func": _prepared_statement_name,
+    }
+
+
+def _create_engine(url: str, metrics: PoolMetrics, pgbouncer_mode: bool = settings.DB_PGBOUNCER_MODE) -> AsyncEngine:
+    created_engine = create_async_engine(
+        url=url,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=_connect_args(pgbouncer_mode),
+        **_pool_kwargs(pgbouncer_mode)
+    )
+    register_pool_events(created_engine, metrics)
+    register_connect_events(created_engine)
+    register_query_stats_events(created_engine)
+    return created_engine
+
+
+# Метрики пулов раздельные: ожидание соединения реплики не должно влиять на обратное давление primary
+pool_metrics = PoolMetrics()
+engine = _create_engine(settings.POSTGRESQL_URL, pool_metrics)
 async_session_maker = async_sessionmaker(engine, class_=AsyncSession)
+# Сессии с транзакциями только для чтения: asyncpg открывает их как BEGIN READ ONLY (без отдельного запроса)
+read_only_session_maker = async_sessionmaker(engine.execution_options(postgresql_readonly=True), class_=AsyncSession)
+
+# Реплика для read-only сессий (опционально, см. app/main_dao/replica.py)
+replica_pool_metrics = PoolMetrics() if settings.POSTGRESQL_REPLICA_URL else None
+replica_engine = (_create_engine(settings.POSTGRESQL_REPLICA_URL, replica_pool_metrics)
+                  if settings.POSTGRESQL_REPLICA_URL else None)
+replica_session_maker = (async_sessionmaker(replica_engine.execution_options(postgresql_readonly=True), class_=AsyncSession)
+                         if replica_engine else None)
 
 
 class Base(AsyncAttrs, DeclarativeBase):
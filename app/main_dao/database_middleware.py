@@ -1,36 +1,69 @@
 from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
 from aiogram.types import Message, CallbackQuery
 from app.main_dao.base import async_session_scope
+from app.main_dao.query_stats import track_queries
+from app.main_dao.db_budget import STATEMENT_TIMEOUT_FLAG, LOCK_TIMEOUT_FLAG
 
+SESSION_WITHOUT_COMMIT_KEY = 'session_without_commit'
+SESSION_WITH_COMMIT_KEY = 'session_with_commit'
 
-class BaseDatabaseMiddleware(BaseMiddleware):
-    async def __call__(self, handler: Callable[[Message | CallbackQuery, Dict[str, Any]], Awaitable[Any]],
-                       event: Message | CallbackQuery, data: Dict[str, Any]) -> Any:
-
-        async with async_session_scope() as session:
-            self.set_session(data, session)
-            result = await handler(event, data)
-            await self.after_handler(session)
-            return result
 
-    def set_session(self, data: Dict[str, Any], session) -> None:
-        """Метод для установки сессии в словарь данных."""
-        raise NotImplementedError("Этот метод должен быть реализован в подклассах.")
+class DatabaseMiddleware(BaseMiddleware):
+    """
+    Единая сессия БД на апдейт.
 
-    async def after_handler(self, session) -> None:
-        """Метод для выполнения действий после вызова хендлера."""
-        pass
+    Регистрируется как inner-middleware (dp.message / dp.callback_query), чтобы видеть конечный хендлер.
+    Сессия открывается только если хендлер запрашивает `session_without_commit` и/или `session_with_commit`,
+    а соединение из пула берётся SQLAlchemy лениво — при первом реальном запросе.
+    Оба представления указывают на одну и ту же сессию; коммит выполняется только для `session_with_commit`.
+    Если хендлеру нужна только `session_without_commit`, при `read_only_transactions=True` сессия открывается
+    в режиме только для чтения (BEGIN READ ONLY, завершение откатом, допускается реплика).
+    Бюджет времени запросов задаётся флагами хендлера, например `@flags.db_statement_timeout(2)`
+    и `@flags.db_lock_timeout(0.5)` (сек).
+    Запросы хендлера учитываются в статистике `track_queries` (количество, время БД, N+1, медленные запросы).
+    """
+    def __init__(self, read_only_transactions: bool = True):
+        self.read_only_transactions = read_only_transactions
 
+    async def __call__(self, handler: Callable[[Message | CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+                       event: Message | CallbackQuery, data: Dict[str, Any]) -> Any:
+        wants_read, wants_commit = self.resolve_session_views(data)
+        with track_queries(self.describe_handler(event, data)):
+            if not wants_read and not wants_commit:
+                return await handler(event, data)
 
-class DatabaseMiddlewareWithoutCommit(BaseDatabaseMiddleware):
-    def set_session(self, data: Dict[str, Any], session) -> None:
-        data['session_without_commit'] = session
+            # Только представление без коммита — read-only транзакция, сессию можно направить на реплику
+            async with async_session_scope(read_only=self.read_only_transactions and not wants_commit,
+                                           statement_timeout=get_flag(data, STATEMENT_TIMEOUT_FLAG),
+                                           lock_timeout=get_flag(data, LOCK_TIMEOUT_FLAG)) as session:
+                if wants_read:
+                    data[SESSION_WITHOUT_COMMIT_KEY] = session
+                if wants_commit:
+                    data[SESSION_WITH_COMMIT_KEY] = session
+                result = await handler(event, data)
+                if wants_commit:
+                    await session.commit()
+                return result
 
+    @staticmethod
+    def describe_handler(event: Message | CallbackQuery, data: Dict[str, Any]) -> str:
+        handler_object = data.get('handler')
+        handler_name = getattr(handler_object.callback, '__qualname__', '?') if handler_object else '?'
+        return f"{type(event).__name__} -> {handler_name}"
 
-class DatabaseMiddlewareWithCommit(BaseDatabaseMiddleware):
-    def set_session(self, data: Dict[str, Any], session) -> None:
-        data['session_with_commit'] = session
+    @staticmethod
+    def resolve_session_views(data: Dict[str, Any]) -> tuple[bool, bool]:
+        """
+        Определяет, какие представления сессии нужны хендлеру.
 
-    async def after_handler(self, session) -> None:
-        await session.commit()
+        Returns:
+            tuple[bool, bool]: (нужна ли сессия без коммита, нужна ли сессия с коммитом)
+        """
+        handler_object = data.get('handler')
+        if handler_object is None or handler_object.varkw:
+            # Хендлер неизвестен (middleware на dp.update) или принимает **kwargs — отдаём оба представления
+            return True, True
+        return (SESSION_WITHOUT_COMMIT_KEY in handler_object.params,
+                SESSION_WITH_COMMIT_KEY in handler_object.params)
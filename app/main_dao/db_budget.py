@@ -0,0 +1,50 @@
+import logging
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Ключ session.info с бюджетом (statement_timeout, lock_timeout) в секундах
+BUDGET_KEY = 'db_budget'
+# Флаги aiogram-хендлеров, например @flags.db_statement_timeout(2)
+STATEMENT_TIMEOUT_FLAG = 'db_statement_timeout'
+LOCK_TIMEOUT_FLAG = 'db_lock_timeout'
+# query_canceled (statement_timeout) и lock_not_available (lock_timeout)
+DB_TIMEOUT_SQLSTATES = frozenset({'57014', '55P03'})
+# Один запрос вместо двух SET LOCAL; незаданное значение остаётся текущим
+SET_LOCAL_TIMEOUTS_QUERY = text(
+    "SELECT set_config('statement_timeout', COALESCE(:statement_timeout, current_setting('statement_timeout')), true), "
+    "set_config('lock_timeout', COALESCE(:lock_timeout, current_setting('lock_timeout')), true)"
+)
+
+
+def set_session_budget(session: AsyncSession, statement_timeout: float | None, lock_timeout: float | None) -> None:
+    """
+    Задаёт бюджет времени для транзакций сессии: в начале каждой транзакции выполняется
+    `set_config(..., is_local => true)` (аналог SET LOCAL) для statement_timeout и lock_timeout.
+    Значения None или 0 не применяются.
+    """
+    if statement_timeout or lock_timeout:
+        session.info[BUDGET_KEY] = (statement_timeout, lock_timeout)
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_session_budget(session: Session, transaction, connection) -> None:
+    budget = session.info.get(BUDGET_KEY)
+    if budget is None:
+        return
+    statement_timeout, lock_timeout = budget
+    connection.execute(SET_LOCAL_TIMEOUTS_QUERY, {"statement_timeout": _to_setting(statement_timeout),
+                                                  "lock_timeout": _to_setting(lock_timeout)})
+
+
+def _to_setting(seconds: float | None) -> str | None:
+    return f"{int(seconds * 1000)}ms" if seconds else None
+
+
+def is_db_timeout_error(error: BaseException) -> bool:
+    """Ошибка вызвана превышением statement_timeout / lock_timeout."""
+    return isinstance(error, DBAPIError) and getattr(error.orig, 'sqlstate', None) in DB_TIMEOUT_SQLSTATES
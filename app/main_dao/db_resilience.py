@@ -0,0 +1,186 @@
+import logging
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError, DBAPIError, OperationalError, InterfaceError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Ключ session.info: сессия получила соединение (транзакция на уровне БД начата)
+CONNECTED_KEY = 'db_connected'
+# Атрибут исключения, выброшенного драйвером при установке соединения (asyncpg выбрасывает их без обёртки SQLAlchemy)
+CONNECT_ERROR_ATTR = '_db_connect_error'
+# Недоступность сервера: admin/crash shutdown, cannot connect now, too many connections (плюс весь класс 08)
+CONNECTION_SQLSTATES = frozenset({'57P01', '57P02', '57P03', '53300'})
+# serialization_failure и deadlock_detected — транзакцию можно безопасно повторить целиком
+SERIALIZATION_SQLSTATES = frozenset({'40001', '40P01'})
+
+
+class DatabaseUnavailableError(SQLAlchemyError):
+    """БД считается недоступной (circuit breaker открыт): сессия отклонена без обращения к пулу."""
+
+
+def _sqlstate(error: BaseException) -> str | None:
+    return getattr(getattr(error, 'orig', None), 'sqlstate', None)
+
+
+def is_connection_error(error: BaseException, connected: bool = True) -> bool:
+    """
+    Ошибка установки или потери соединения с БД (в отличие от ошибок конкретного запроса).
+
+    Учитываются только ошибки SQLAlchemy и драйвера: исключения кода внутри сессии (TimeoutError asyncio,
+    сетевые ошибки Telegram) и исчерпание пула (TimeoutError пула) недоступностью БД не считаются.
+
+    Args:
+        error (BaseException): Исключение
+        connected (bool): Сессия успела получить соединение; ошибка драйвера до этого — ошибка подключения
+    """
+    if getattr(error, CONNECT_ERROR_ATTR, False):
+        return True
+    if not isinstance(error, DBAPIError):
+        return False
+    sqlstate = _sqlstate(error) or ''
+    if error.connection_invalidated or sqlstate.startswith('08') or sqlstate in CONNECTION_SQLSTATES:
+        return True
+    return not connected and isinstance(error, (OperationalError, InterfaceError))
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Временная ошибка, после которой транзакцию можно повторить."""
+    return is_connection_error(error) or _sqlstate(error) in SERIALIZATION_SQLSTATES
+
+
+@event.listens_for(Session, "after_begin")
+def _mark_session_connected(session: Session, transaction, connection) -> None:
+    session.info[CONNECTED_KEY] = True
+
+
+def register_connect_events(engine: AsyncEngine) -> None:
+    """Помечает исключения установки соединения драйвером (`CONNECT_ERROR_ATTR`) для `is_connection_error`."""
+
+    @event.listens_for(engine.sync_engine, "do_connect")
+    def _do_connect(dialect, connection_record, cargs, cparams):
+        try:
+            return dialect.connect(*cargs, **cparams)
+        except Exception as e:
+            setattr(e, CONNECT_ERROR_ATTR, True)
+            raise
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker для сессий primary.
+
+    После `failure_threshold` подряд ошибок соединения переходит в состояние open: новые сессии отклоняются
+    `DatabaseUnavailableError` сразу, не занимая очередь пула. Через `reset_timeout` секунд пропускается
+    одна пробная сессия (half_open): успех закрывает breaker, ошибка снова открывает его.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.rejected = 0
+        self.opened_count = 0
+
+    def before_session(self) -> bool:
+        """
+        Проверяет, можно ли открыть сессию; иначе выбрасывает `DatabaseUnavailableError`.
+
+        Returns:
+            bool: True, если сессия — пробная (half_open)
+        """
+        if self.state == self.CLOSED:
+            return False
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        raise DatabaseUnavailableError("База данных недоступна (circuit breaker открыт).")
+
+    def after_session(self, probe: bool, connected: bool, connection_failed: bool) -> None:
+        if probe:
+            self._probe_in_flight = False
+        if connection_failed:
+            self._record_failure()
+        elif connected:
+            self._record_success()
+
+    def _record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info("Соединение с БД восстановлено, circuit breaker закрыт.")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+
+    def _record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or (self.state == self.CLOSED
+                                            and self.consecutive_failures >= self.failure_threshold):
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            self.opened_count += 1
+            logger.error(f"БД недоступна ({self.consecutive_failures} ошибок соединения подряд), "
+                         f"circuit breaker открыт на {self.reset_timeout} сек.")
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "rejected": self.rejected,
+            "opened_count": self.opened_count,
+        }
+
+
+class RetryBudget:
+    """
+    Глобальный бюджет повторов: каждая операция пополняет его на `ratio` токена, каждый повтор тратит токен;
+    дополнительно бюджет пополняется на `min_per_second` токенов в секунду. Ограничивает долю повторов
+    при массовых сбоях, чтобы повторы не умножали нагрузку на БД.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float, max_tokens: float):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated_at = time.monotonic()
+        self.retries = 0
+        self.exhausted = 0
+
+    def _refill(self, amount: float = 0.0) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + amount + (now - self._updated_at) * self.min_per_second)
+        self._updated_at = now
+
+    def deposit(self) -> None:
+        self._refill(self.ratio)
+
+    def try_spend(self) -> bool:
+        self._refill()
+        if self._tokens < 1:
+            self.exhausted += 1
+            return False
+        self._tokens -= 1
+        self.retries += 1
+        return True
+
+    def stats(self) -> dict:
+        self._refill()
+        return {"tokens": round(self._tokens, 2), "retries": self.retries, "exhausted": self.exhausted}
+
+
+db_circuit_breaker = CircuitBreaker(failure_threshold=settings.DB_BREAKER_FAILURE_THRESHOLD,
+                                    reset_timeout=settings.DB_BREAKER_RESET_TIMEOUT)
+db_retry_budget = RetryBudget(ratio=settings.DB_RETRY_BUDGET_RATIO,
+                              min_per_second=settings.DB_RETRY_BUDGET_MIN_PER_SECOND,
+                              max_tokens=settings.DB_RETRY_BUDGET_MAX_TOKENS)
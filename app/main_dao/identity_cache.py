@@ -0,0 +1,74 @@
+import itertools
+import logging
+from typing import Any, Hashable
+
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class IdentityCache:
+    """
+    Внутрипроцессный LRU+TTL кеш отсоединённых от сессии снимков записей по ключевому полю (например, telegram_id).
+
+    Заполняется DAO при чтении и сбрасывается методами записи BaseDAO (add, add_many, upsert, update,
+    bulk_update, delete). Хранит и отрицательный результат (None), если запись не найдена.
+    Кеш не разделяется между процессами: изменения, сделанные в обход DAO или другим процессом,
+    становятся видны не позже чем через `ttl` секунд.
+
+    Чтение берёт `generation(key)` до запроса к БД и передаёт её в `set`: если ключ за время запроса
+    был инвалидирован (запись закоммичена), прочитанная старая версия в кеш не попадает.
+    """
+    MISSING = object()
+
+    def __init__(self, key_field: str, maxsize: int, ttl: float):
+        self.key_field = key_field
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Поколения инвалидированных ключей (уникальные значения счётчика) и поколение полной очистки
+        self._generations: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._counter = itertools.count(1)
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale_sets = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Возвращает снимок записи либо `IdentityCache.MISSING`, если ключа нет в кеше."""
+        value = self._cache.get(key, self.MISSING)
+        if value is self.MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def generation(self, key: Hashable) -> tuple[int, int]:
+        """Поколение ключа: меняется при каждой инвалидации ключа или всего кеша."""
+        return self._epoch, self._generations.get(key, 0)
+
+    def set(self, key: Hashable, value: Any, generation: tuple[int, int] | None = None) -> None:
+        """Сохраняет снимок; если передано `generation` и ключ с тех пор инвалидирован — не сохраняет."""
+        if generation is not None and generation != self.generation(key):
+            self.stale_sets += 1
+            return
+        self._cache[key] = value
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """Сбрасывает запись по ключу; без ключа очищает кеш целиком."""
+        if key is None:
+            self._epoch += 1
+            self._cache.clear()
+            logger.debug(f"Кеш по {self.key_field} очищен.")
+        else:
+            self._generations[key] = next(self._counter)
+            self._cache.pop(key, None)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "stale_sets": self.stale_sets,
+        }
@@ -0,0 +1,105 @@
+import logging
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """
+    Живая статистика пула соединений одного движка: обновляется событиями пула SQLAlchemy
+    (connect / checkout / checkin / invalidate) и замерами ожидания соединения в `MeasuredAsyncQueuePool`.
+    """
+    # Коэффициент сглаживания для скользящего среднего времени ожидания
+    EWMA_ALPHA = 0.2
+
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.waiting = 0
+        self.acquire_timeouts = 0
+        self.wait_count = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.wait_time_ewma = 0.0
+
+    def observe_wait(self, seconds: float) -> None:
+        self.wait_count += 1
+        self.wait_time_total += seconds
+        self.wait_time_max = max(self.wait_time_max, seconds)
+        self.wait_time_ewma += self.EWMA_ALPHA * (seconds - self.wait_time_ewma)
+
+    def snapshot(self, engine: AsyncEngine) -> dict:
+        pool = engine.pool
+        return {
+            "pool_size": pool.size() if hasattr(pool, "size") else None,
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+            "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+            "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+            "waiting": self.waiting,
+            "acquire_timeouts": self.acquire_timeouts,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidations": self.invalidations,
+            "wait_count": self.wait_count,
+            "wait_time_avg": round(self.wait_time_total / self.wait_count, 6) if self.wait_count else 0.0,
+            "wait_time_ewma": round(self.wait_time_ewma, 6),
+            "wait_time_max": round(self.wait_time_max, 6),
+        }
+
+
+class MeasuredAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool, замеряющий время ожидания свободного соединения в `metrics` своего движка."""
+    metrics: PoolMetrics | None = None
+
+    def _do_get(self):
+        metrics = self.metrics
+        if metrics is None:
+            return super()._do_get()
+        metrics.waiting += 1
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            metrics.acquire_timeouts += 1
+            raise
+        finally:
+            metrics.waiting -= 1
+            metrics.observe_wait(time.perf_counter() - started)
+
+    def recreate(self) -> "MeasuredAsyncQueuePool":
+        # Пул пересоздаётся при dispose(); подписки на события SQLAlchemy переносит сама, метрики — здесь
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def register_pool_events(engine: AsyncEngine, metrics: PoolMetrics) -> None:
+    """Подписывает `metrics` на события пула движка (у каждого движка — свои метрики)."""
+    pool = engine.sync_engine.pool
+    if isinstance(pool, MeasuredAsyncQueuePool):
+        pool.metrics = metrics
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        metrics.connects += 1
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.checkouts += 1
+
+    @event.listens_for(pool, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        metrics.checkins += 1
+
+    @event.listens_for(pool, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidations += 1
+        logger.warning(f"Соединение пула БД инвалидировано: {exception}")
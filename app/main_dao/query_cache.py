@@ -0,0 +1,259 @@
+import asyncio
+import hashlib
+import logging
+import pickle
+from abc import ABC, abstractmethod
+from typing import Any, Sequence
+
+from cachetools import TTLCache
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+# Теги, изменённые в текущей транзакции сессии (session.info)
+DIRTY_TAGS_KEY = 'query_cache_dirty_tags'
+
+
+class QueryCacheBackend(ABC):
+    """
+    Хранилище результатов запросов с инвалидацией по тегам.
+
+    Версии тегов берутся до запроса к БД (`versions`) и передаются в `set`: если тег за время запроса
+    был инвалидирован, результат не сохраняется.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Any:
+        """Возвращает значение либо `MISSING`, если ключа нет (или он инвалидирован)."""
+
+    @abstractmethod
+    async def versions(self, tags: Sequence[str]) -> tuple:
+        """Текущие версии тегов."""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, tags: Sequence[str], ttl: float, versions: tuple) -> bool:
+        """
+        Сохраняет значение, если версии тегов не изменились с момента `versions`.
+        Возвращает False, если значение устарело и отброшено.
+        """
+
+    @abstractmethod
+    async def invalidate_tags(self, *tags: str) -> None:
+        ...
+
+
+class MemoryQueryCacheBackend(QueryCacheBackend):
+    """
+    Внутрипроцессный LRU+TTL бэкенд.
+
+    Инвалидация тега — увеличение его версии: записи, сохранённые при старой версии,
+    больше не выдаются и вытесняются из кеша по TTL или размеру.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._tag_versions: dict[str, int] = {}
+
+    def _versions(self, tags: Sequence[str]) -> tuple:
+        return tuple(self._tag_versions.get(tag, 0) for tag in tags)
+
+    async def get(self, key: str) -> Any:
+        entry = self._cache.get(key)
+        if entry is None:
+            return MISSING
+        tags, versions, value = entry
+        if self._versions(tags) != versions:
+            self._cache.pop(key, None)
+            return MISSING
+        return value
+
+    async def versions(self, tags: Sequence[str]) -> tuple:
+        return self._versions(tags)
+
+    async def set(self, key: str, value: Any, tags: Sequence[str], ttl: float, versions: tuple) -> bool:
+        # TTL задаётся на уровне TTLCache, общий для всех записей
+        if self._versions(tags) != versions:
+            return False
+        self._cache[key] = (tuple(tags), versions, value)
+        return True
+
+    async def invalidate_tags(self, *tags: str) -> None:
+        for tag in tags:
+            self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+
+
+class RedisQueryCacheBackend(QueryCacheBackend):
+    """
+    Бэкенд на Redis, общий для всех процессов бота и API.
+
+    Значения сериализуются pickle и хранятся с TTL; для каждого тега ведётся множество его ключей и счётчик
+    версии, инвалидация увеличивает версию и удаляет ключи тега одним pipeline. Запись (`SET_SCRIPT`) атомарно
+    проверяет версии тегов. Ограничение объёма — TTL и политика maxmemory Redis.
+    Ошибки Redis не прерывают чтение: запрос просто уходит в БД.
+    """
+    # KEYS: ключ значения, n ключей множеств тегов, n ключей версий тегов;
+    # ARGV: n, ttl (мс), значение, ключ без префикса, n ожидаемых версий
+    SET_SCRIPT = """
+local n = tonumber(ARGV[1])
+for i = 1, n do
+    if (redis.call('GET', KEYS[1 + n + i]) or '0') ~= ARGV[4 + i] then
+        return 0
+    end
+end
+redis.call('SET', KEYS[1], ARGV[3], 'PX', ARGV[2])
+for i = 1, n do
+    redis.call('SADD', KEYS[1 + i], ARGV[4])
+    redis.call('PEXPIRE', KEYS[1 + i], ARGV[2])
+end
+return 1
+"""
+
+    def __init__(self, redis: Redis, prefix: str = 'query_cache'):
+        self._redis = redis
+        self._prefix = prefix
+        self._set_script = redis.register_script(self.SET_SCRIPT)
+
+    def _key(self, key: str) -> str:
+        return f"{self._prefix}:{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self._prefix}:tag:{tag}"
+
+    def _version_key(self, tag: str) -> str:
+        return f"{self._prefix}:version:{tag}"
+
+    async def get(self, key: str) -> Any:
+        try:
+            raw = await self._redis.get(self._key(key))
+        except RedisError as e:
+            logger.warning(f"Кеш запросов недоступен (get): {e}")
+            return MISSING
+        return MISSING if raw is None else pickle.loads(raw)
+
+    async def versions(self, tags: Sequence[str]) -> tuple:
+        try:
+            raw = await self._redis.mget([self._version_key(tag) for tag in tags]) if tags else []
+        except RedisError as e:
+            logger.warning(f"Кеш запросов недоступен (versions): {e}")
+            return ()
+        return tuple((value.decode() if isinstance(value, bytes) else value) or '0' for value in raw)
+
+    async def set(self, key: str, value: Any, tags: Sequence[str], ttl: float, versions: tuple) -> bool:
+        if len(versions) != len(tags):
+            # Версии не удалось получить (Redis недоступен) — без проверки значение не сохраняется
+            return True
+        try:
+            stored = await self._set_script(
+                keys=[self._key(key), *map(self._tag_key, tags), *map(self._version_key, tags)],
+                args=[len(tags), int(ttl * 1000), pickle.dumps(value), key, *versions])
+        except RedisError as e:
+            logger.warning(f"Кеш запросов недоступен (set): {e}")
+            return True
+        return bool(stored)
+
+    async def invalidate_tags(self, *tags: str) -> None:
+        try:
+            for tag in tags:
+                keys = await self._redis.smembers(self._tag_key(tag))
+                async with self._redis.pipeline(transaction=True) as pipe:
+                    pipe.incr(self._version_key(tag))
+                    if keys:
+                        pipe.delete(*[self._key(key.decode() if isinstance(key, bytes) else key) for key in keys])
+                    pipe.delete(self._tag_key(tag))
+                    await pipe.execute()
+        except RedisError as e:
+            logger.error(f"Не удалось инвалидировать кеш запросов по тегам {tags}: {e}")
+
+
+class QueryCache:
+    """
+    Кеш результатов чтения BaseDAO (find_one_or_none, find_all, count).
+
+    Ключ строится из имени таблицы, метода, фильтров и проекции; тег — имя таблицы.
+    Методы записи BaseDAO инвалидируют тег своей модели сразу и повторно после коммита
+    (до коммита конкурентные чтения могут закешировать старые данные), а сама пишущая сессия
+    до конца транзакции кеш по этому тегу не использует. Результат чтения, начатого до инвалидации,
+    не сохраняется (см. `versions`). Изменения в обход DAO становятся видны
+    не позже чем через `ttl` секунд.
+    """
+
+    def __init__(self, backend: QueryCacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.stale_sets = 0
+
+    @staticmethod
+    def make_key(tag: str, *parts: Any) -> str:
+        digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+        return f"{tag}:{digest}"
+
+    async def get(self, key: str) -> Any:
+        value = await self.backend.get(key)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def versions(self, tags: Sequence[str]) -> tuple:
+        """Версии тегов, которые берутся до запроса к БД и передаются в `set`."""
+        return await self.backend.versions(tags)
+
+    async def set(self, key: str, value: Any, tags: Sequence[str], versions: tuple) -> None:
+        if not await self.backend.set(key, value, tags, self.ttl, versions):
+            self.stale_sets += 1
+
+    async def invalidate(self, *tags: str) -> None:
+        await self.backend.invalidate_tags(*tags)
+        logger.debug(f"Кеш запросов инвалидирован по тегам: {tags}")
+
+    async def invalidate_in_session(self, session: AsyncSession, *tags: str) -> None:
+        """Инвалидирует теги и помечает их изменёнными в транзакции сессии (повтор — после коммита)."""
+        session.info.setdefault(DIRTY_TAGS_KEY, {}).setdefault(self, set()).update(tags)
+        await self.invalidate(*tags)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "stale_sets": self.stale_sets,
+        }
+
+
+_background_tasks: set[asyncio.Task] = set()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_dirty_tags_after_commit(session: Session) -> None:
+    for cache, tags in session.info.pop(DIRTY_TAGS_KEY, {}).items():
+        task = asyncio.get_running_loop().create_task(cache.invalidate(*tags))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_dirty_tags_after_rollback(session: Session) -> None:
+    session.info.pop(DIRTY_TAGS_KEY, None)
+
+
+def create_query_cache() -> QueryCache:
+    if settings.QUERY_CACHE_BACKEND == 'redis':
+        backend = RedisQueryCacheBackend(Redis.from_url(settings.REDIS_URL))
+    else:
+        backend = MemoryQueryCacheBackend(maxsize=settings.QUERY_CACHE_MAXSIZE, ttl=settings.QUERY_CACHE_TTL)
+    return QueryCache(backend=backend, ttl=settings.QUERY_CACHE_TTL)
+
+
+query_cache = create_query_cache()
@@ -0,0 +1,107 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+# Отдельный логгер медленных запросов (пишется также в logs/slow_queries.txt, см. setup_logging)
+slow_query_logger = logging.getLogger("app.slow_queries")
+
+STATEMENT_LOG_LIMIT = 500
+QUERY_START_KEY = 'query_stats_started'
+
+
+def _shorten(statement: str) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= STATEMENT_LOG_LIMIT else statement[:STATEMENT_LOG_LIMIT] + "..."
+
+
+class QueryStats:
+    """Статистика SQL-запросов одной единицы работы: апдейта бота или API-запроса."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.statements = 0
+        self.db_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: str | None = None
+        self._statement_counts: Counter = Counter()
+
+    def observe(self, statement: str, duration: float) -> None:
+        self.statements += 1
+        self.db_time += duration
+        self._statement_counts[statement] += 1
+        if duration > self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_statement = statement
+
+    def repeated_statements(self, threshold: int) -> list[tuple[str, int]]:
+        """Одинаковые выражения (с разными параметрами), выполненные не менее `threshold` раз — признак N+1."""
+        return [(statement, count) for statement, count in self._statement_counts.most_common()
+                if count >= threshold]
+
+    def report(self) -> None:
+        if not self.statements:
+            return
+        summary = (f"{self.label}: запросов {self.statements}, время БД {self.db_time * 1000:.1f} мс, "
+                   f"самый медленный {self.slowest_time * 1000:.1f} мс")
+        repeated = self.repeated_statements(settings.DB_N_PLUS_ONE_THRESHOLD)
+        for statement, count in repeated:
+            logger.warning(f"{self.label}: возможен N+1 — выражение выполнено {count} раз: {_shorten(statement)}")
+        if self.db_time >= settings.DB_SLOW_TOTAL_THRESHOLD:
+            slow_query_logger.warning(f"{summary}: {_shorten(self.slowest_statement)}")
+        else:
+            logger.debug(summary)
+
+
+current_query_stats: ContextVar[QueryStats | None] = ContextVar('current_query_stats', default=None)
+
+
+@contextmanager
+def track_queries(label: str) -> Iterator[QueryStats]:
+    """
+    Собирает статистику запросов всех сессий, выполняемых в текущем контексте (апдейт / API-запрос),
+    и по завершении пишет сводку: N+1 и превышение `DB_SLOW_TOTAL_THRESHOLD` — предупреждением.
+    """
+    stats = QueryStats(label)
+    token = current_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_query_stats.reset(token)
+        stats.report()
+
+
+def register_query_stats_events(engine: AsyncEngine) -> None:
+    """
+    Подписывает движок на before/after_cursor_execute: время каждого запроса учитывается в `current_query_stats`
+    (если он установлен), а запросы дольше `DB_SLOW_QUERY_THRESHOLD` попадают в лог медленных запросов.
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(QUERY_START_KEY, []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info[QUERY_START_KEY].pop()
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.observe(statement, duration)
+        if duration >= settings.DB_SLOW_QUERY_THRESHOLD:
+            slow_query_logger.warning(f"Медленный запрос ({duration * 1000:.1f} мс"
+                                      f"{f', {stats.label}' if stats is not None else ''}): {_shorten(statement)}")
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get(QUERY_START_KEY):
+            connection.info[QUERY_START_KEY].pop()
@@ -0,0 +1,63 @@
+import logging
+import time
+
+from sqlalchemy import text
+
+from app.config.settings import settings
+from app.main_dao.database import replica_engine
+
+logger = logging.getLogger(__name__)
+
+# Отставание реплики в секундах; 0, если всё полученное WAL уже применено (или сервер не является репликой)
+REPLICA_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class ReplicaState:
+    """
+    Состояние реплики для маршрутизации read-only сессий.
+
+    Реплика используется, только если последняя проверка успешна, отставание не превышает
+    `DB_REPLICA_MAX_LAG` и сама проверка не устарела (иначе — откат на primary).
+    """
+
+    def __init__(self):
+        self.lag: float | None = None
+        self.healthy = False
+        self.checked_at: float | None = None
+
+    @property
+    def is_usable(self) -> bool:
+        if replica_engine is None or not self.healthy or self.checked_at is None:
+            return False
+        # Если проверки перестали выполняться, данным о реплике больше нельзя доверять
+        return time.monotonic() - self.checked_at <= settings.DB_REPLICA_CHECK_INTERVAL * 3
+
+    def mark(self, healthy: bool, lag: float | None = None) -> None:
+        if healthy and not self.healthy:
+            logger.info(f"Реплика БД доступна для чтения (отставание: {lag})")
+        elif not healthy and self.healthy:
+            logger.warning(f"Реплика БД исключена из чтения (отставание: {lag})")
+        self.healthy = healthy
+        self.lag = lag
+        self.checked_at = time.monotonic()
+
+
+replica_state = ReplicaState()
+
+
+async def refresh_replica_state() -> None:
+    """Проверяет доступность и отставание реплики (периодическая задача планировщика)."""
+    if replica_engine is None:
+        return
+    try:
+        async with replica_engine.connect() as connection:
+            lag = float((await connection.execute(REPLICA_LAG_QUERY)).scalar() or 0)
+        replica_state.mark(lag <= settings.DB_REPLICA_MAX_LAG, lag)
+    except Exception as e:
+        logger.warning(f"Не удалось проверить состояние реплики БД: {e}")
+        replica_state.mark(False)
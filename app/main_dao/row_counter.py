@@ -0,0 +1,99 @@
+import logging
+import time
+from typing import Literal, Type
+
+from sqlalchemy import select, func, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.settings import settings
+from app.main_dao.database import Base, async_session_maker
+
+logger = logging.getLogger(__name__)
+
+# exact — COUNT(*); estimated — оценка планировщика из pg_class.reltuples;
+# maintained — значение, периодически пересчитываемое планировщиком задач (refresh)
+CountMode = Literal["exact", "estimated", "maintained"]
+
+ESTIMATED_COUNT_QUERY = text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)")
+
+
+class RowCounter:
+    """
+    Дешёвый подсчёт строк таблиц для healthcheck и статистики.
+
+    Для таблиц из `track` значение пересчитывается задачей планировщика `refresh` и отдаётся без запроса к БД.
+    Если значение устарело (старше трёх интервалов обновления) или таблица не отслеживается, режим maintained
+    переходит к estimated; estimated — к exact, если статистика таблицы ещё не собрана (ANALYZE не выполнялся).
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._models: dict[str, Type[Base]] = {}
+        self._counts: dict[str, tuple[int, float]] = {}
+
+    def track(self, *models: Type[Base]) -> None:
+        for model in models:
+            self._models[model.__tablename__] = model
+
+    @staticmethod
+    async def exact(session: AsyncSession, model: Type[Base]) -> int:
+        result = await session.execute(select(func.count()).select_from(model))
+        return result.scalar_one()
+
+    @staticmethod
+    async def estimated(session: AsyncSession, model: Type[Base]) -> int | None:
+        """Оценка из pg_class.reltuples либо None, если статистики ещё нет."""
+        result = await session.execute(ESTIMATED_COUNT_QUERY, {"table_name": model.__table__.fullname})
+        estimate = result.scalar_one_or_none()
+        return estimate if estimate is not None and estimate >= 0 else None
+
+    def maintained(self, model: Type[Base]) -> int | None:
+        """Последнее пересчитанное значение либо None, если его нет или оно устарело."""
+        entry = self._counts.get(model.__tablename__)
+        if entry is None or time.monotonic() - entry[1] > self.refresh_interval * 3:
+            return None
+        return entry[0]
+
+    async def count(self, session: AsyncSession, model: Type[Base], mode: CountMode = "maintained") -> int:
+        """
+        Количество строк таблицы модели.
+
+        Args:
+            session (AsyncSession): Сессия для запросов exact/estimated
+            model (Type[Base]): Модель
+            mode (CountMode): Режим подсчёта (с переходом к более точному режиму, если значение недоступно)
+
+        Returns:
+            int: Количество строк (точное или приблизительное)
+        """
+        if mode == "maintained":
+            count = self.maintained(model)
+            if count is not None:
+                return count
+            mode = "estimated"
+        if mode == "estimated":
+            count = await self.estimated(session, model)
+            if count is not None:
+                return count
+        return await self.exact(session, model)
+
+    async def refresh(self) -> None:
+        """Пересчитывает точное количество строк отслеживаемых таблиц (задача планировщика)."""
+        if not self._models:
+            return
+        try:
+            async with async_session_maker() as session:
+                for table_name, model in self._models.items():
+                    self._counts[table_name] = (await self.exact(session, model), time.monotonic())
+            logger.debug(f"Счётчики строк обновлены: { {name: count for name, (count, _) in self._counts.items()} }")
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при обновлении счётчиков строк: {e}")
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {name: {"count": count, "age": round(now - refreshed_at, 3)}
+                for name, (count, refreshed_at) in self._counts.items()}
+
+
+row_counter = RowCounter(refresh_interval=settings.ROW_COUNT_REFRESH_INTERVAL)
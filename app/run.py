@@ -2,7 +2,12 @@ import asyncio
 import locale
 
 from app.bot.create_bot import dp, bot, admin_router, user_router, shared_router
+from app.bot.webhook import run_webhook
+from app.bot.update_queue import update_queue
+from app.bot.dispatch_scheduler import dispatch_scheduler
+from app.config.settings import settings
 from app.scheduler.create_scheduler import scheduler
+from app.actions.services.profile_sync_service import profile_buffer
 from app.scheduler.add_default_jobs import add_default_jobs
 from app.log.custom_logger import setup_logging
 import logging
@@ -12,7 +17,7 @@ logger = logging.getLogger(__name__)
 
 
 
-async def setup_api():
+async def setup_api() -> asyncio.Task:
     root_logger = logging.getLogger()
     for name in ["uvicorn", "uvicorn.error", "uvicorn.access", "fastapi", "asyncio"]:
         logger = logging.getLogger(name)
@@ -31,7 +36,7 @@ async def setup_api():
         log_config=None
     )
     server = Server(config)
-    asyncio.create_task(server.serve())
+    return asyncio.create_task(server.serve())
 
 def setup_routers():
     dp.include_router(admin_router)
@@ -39,23 +44,42 @@ def setup_routers():
     dp.include_router(shared_router)
 
 
-async def setup_scheduler():
+async def setup_scheduler(include_row_counts: bool = True):
     scheduler.start()
-    await add_default_jobs()
+    await add_default_jobs(include_row_counts=include_row_counts)
+
+
+async def run_polling_to_queue():
+    # Апдейты обрабатывают воркеры (app/worker.py), этот процесс только публикует их в Redis Streams
+    await bot.delete_webhook(drop_pending_updates=True)
+    await dp.emit_startup(bot=bot, bots=[bot], dispatcher=dp)
+    try:
+        await update_queue.run_polling(bot, allowed_updates=dp.resolve_used_update_types())
+    finally:
+        await dp.emit_shutdown(bot=bot, bots=[bot], dispatcher=dp)
 
 
 async def main():
     setup_logging()
     setup_routers()
     await setup_scheduler()
-    await setup_api()
+    api_task = await setup_api()
 
     try:
-        await bot.delete_webhook(drop_pending_updates=True)
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        if settings.BOT_UPDATES_MODE == "webhook":
+            await run_webhook(api_task)
+        elif settings.UPDATE_QUEUE_ENABLED:
+            await run_polling_to_queue()
+        else:
+            await bot.delete_webhook(drop_pending_updates=True)
+            # С планировщиком апдейт только ставится в очередь чата, отдельная задача aiogram не нужна
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types(),
+                                   handle_as_tasks=settings.DISPATCH_CONCURRENCY_LIMIT <= 0)
     except Exception as e:
         logger.exception(f"Ошибка при запуске бота: \n{logger.critical('e')}")
     finally:
+        await dispatch_scheduler.wait_idle(timeout=30)
+        await profile_buffer.flush()
         scheduler.shutdown()
         await bot.session.close()
 
@@ -1,7 +1,24 @@
+from datetime import datetime
+
+from app.actions.services.profile_sync_service import profile_buffer
 from app.config.settings import settings
+from app.main_dao.models import TgUser
+from app.main_dao.replica import refresh_replica_state
+from app.main_dao.row_counter import row_counter
 from app.scheduler.create_scheduler import scheduler
 
 
-async def add_default_jobs():
+async def add_default_jobs(include_row_counts: bool = True):
     # Импортировать в файл функции для периодического автоматического старта и вызывать их здесь
-    pass
+    scheduler.add_job(profile_buffer.flush, 'interval', seconds=settings.PROFILE_SYNC_FLUSH_INTERVAL,
+                      id='flush_profile_buffer', replace_existing=True, max_instances=1, coalesce=True)
+    # Счётчики строк нужны только процессу с API (/ping): в воркерах очереди апдейтов точный COUNT(*) не запускается
+    if include_row_counts:
+        row_counter.track(TgUser)
+        scheduler.add_job(row_counter.refresh, 'interval', seconds=settings.ROW_COUNT_REFRESH_INTERVAL,
+                          next_run_time=datetime.now(settings.DEFAULT_TZ), id='refresh_row_counts',
+                          replace_existing=True, max_instances=1, coalesce=True)
+    if settings.POSTGRESQL_REPLICA_URL:
+        scheduler.add_job(refresh_replica_state, 'interval', seconds=settings.DB_REPLICA_CHECK_INTERVAL,
+                          next_run_time=datetime.now(settings.DEFAULT_TZ), id='refresh_replica_state',
+                          replace_existing=True, max_instances=1)
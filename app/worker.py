@@ -0,0 +1,64 @@
+"""
+Воркер очереди апдейтов Redis Streams (UPDATE_QUEUE_ENABLED=True).
+
+Запуск n воркеров: python -m app.worker --index 0 --count n ... python -m app.worker --index n-1 --count n
+Каждый воркер использует те же роутеры и middleware, что и основной процесс (app/bot/create_bot.py).
+"""
+import argparse
+import asyncio
+import logging
+import signal
+
+from aiogram.types import Update
+
+from app.actions.services.profile_sync_service import profile_buffer
+from app.bot.create_bot import dp, bot
+from app.bot.dispatch_scheduler import dispatch_scheduler
+from app.bot.management.shared.middlewares.dispatch_scheduler import WAIT_DISPATCH_KEY
+from app.bot.update_queue import UpdateWorker, update_queue
+from app.config.settings import settings
+from app.log.custom_logger import setup_logging
+from app.run import setup_routers, setup_scheduler
+from app.scheduler.create_scheduler import scheduler
+
+logger = logging.getLogger(__name__)
+
+
+def decode_update(raw: str) -> Update:
+    return Update.model_validate_json(raw, context={"bot": bot})
+
+
+async def handle_update(update: Update) -> None:
+    await dp.feed_update(bot, update, **{WAIT_DISPATCH_KEY: True})
+
+
+async def main(index: int, count: int):
+    setup_logging()
+    setup_routers()
+    await setup_scheduler(include_row_counts=False)
+
+    worker = UpdateWorker(update_queue, index=index, count=count, handle=handle_update, decode=decode_update,
+                          batch_size=settings.UPDATE_QUEUE_BATCH_SIZE, claim_idle=settings.UPDATE_QUEUE_CLAIM_IDLE)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.run()
+    except Exception as e:
+        logger.exception(f"Ошибка воркера очереди апдейтов: {e}")
+    finally:
+        await dispatch_scheduler.wait_idle(timeout=30)
+        await profile_buffer.flush()
+        scheduler.shutdown()
+        await bot.session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Воркер очереди апдейтов Redis Streams")
+    parser.add_argument("--index", type=int, default=0, help="Номер воркера (0..count-1)")
+    parser.add_argument("--count", type=int, default=1, help="Общее число воркеров")
+    args = parser.parse_args()
+    if not 0 <= args.index < args.count:
+        parser.error("--index должен быть в диапазоне 0..count-1")
+    asyncio.run(main(args.index, args.count))